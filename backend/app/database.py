@@ -1,20 +1,133 @@
 """SQLAlchemy database setup and session management."""
+import logging
+import re
+import threading
 from pathlib import Path
 
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 
-from app.config import DATABASE_PATH, DB_DIR
+from app.config import (
+    DATABASE_URL,
+    DB_MAX_OVERFLOW,
+    DB_POOL_RECYCLE_SECONDS,
+    DB_POOL_SIZE,
+    DB_POOL_TIMEOUT_SECONDS,
+    SQLITE_BUSY_TIMEOUT_MS,
+    SQLITE_CACHE_SIZE_KB,
+    SQLITE_JOURNAL_MODE,
+    SQLITE_MMAP_SIZE_MB,
+    SQLITE_SERIALIZE_WRITES,
+    SQLITE_SYNCHRONOUS,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _engine_urls(database_url: str) -> tuple[URL, URL]:
+    """(sync, async) URLs. PostgreSQL goes through psycopg 3, which provides both drivers."""
+    url = make_url(database_url)
+    if url.drivername in {"postgres", "postgresql"}:  # Render/Heroku-style URLs name no driver
+        url = url.set(drivername="postgresql+psycopg")
+    if url.get_backend_name() == "sqlite":
+        return url, url.set(drivername="sqlite+aiosqlite")
+    return url, url
+
+
+sync_url, async_url = _engine_urls(DATABASE_URL)
+IS_SQLITE = sync_url.get_backend_name() == "sqlite"
+
+if IS_SQLITE:
+    if sync_url.database and sync_url.database != ":memory:":
+        # Ensure data directory exists
+        Path(sync_url.database).parent.mkdir(parents=True, exist_ok=True)
+    engine = create_engine(
+        sync_url,
+        connect_args={"check_same_thread": False, "timeout": SQLITE_BUSY_TIMEOUT_MS / 1000},
+        echo=False,
+    )
+    # Async routes use aiosqlite, which runs SQLite calls on its own thread so queries do not block
+    # the event loop.
+    async_engine = create_async_engine(
+        async_url,
+        connect_args={"timeout": SQLITE_BUSY_TIMEOUT_MS / 1000},
+        echo=False,
+    )
+else:
+    # Each engine (sync and async) keeps its own pool; pre-ping drops connections the server or a
+    # proxy closed while idle, recycle bounds connection age.
+    _pool = {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT_SECONDS,
+        "pool_recycle": DB_POOL_RECYCLE_SECONDS,
+        "pool_pre_ping": True,
+    }
+    engine = create_engine(sync_url, echo=False, **_pool)
+    async_engine = create_async_engine(async_url, echo=False, **_pool)
+
+
+def _sqlite_profile(dbapi_connection, connection_record):
+    """WAL lets readers run alongside the writer; busy_timeout makes writers wait instead of failing."""
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}")
+    cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}")
+    cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE_MB * 1024 * 1024}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
+
+if IS_SQLITE:
+    event.listen(engine, "connect", _sqlite_profile)
+    event.listen(async_engine.sync_engine, "connect", _sqlite_profile)
+
+
+# Single writer: a connection takes the lock at its first write statement and holds it until
+# commit/rollback, so concurrent writers queue here rather than hitting "database is locked".
+# Sync engine only: blocking on it would stall the event loop, so async writers queue on
+# busy_timeout inside aiosqlite's thread instead.
+_WRITE_STATEMENT = re.compile(r"^\s*(INSERT|UPDATE|DELETE|REPLACE|CREATE|ALTER|DROP)\b", re.IGNORECASE)
+_writer_lock = threading.Lock()
+
+
+def _release_writer(info: dict) -> None:
+    if info.pop("holds_writer_lock", False):
+        _writer_lock.release()
+
+
+if IS_SQLITE and SQLITE_SERIALIZE_WRITES:
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _acquire_writer(conn, cursor, statement, parameters, context, executemany):
+        if conn.info.get("holds_writer_lock") or not _WRITE_STATEMENT.match(statement):
+            return
+        # Bounded wait: past the busy timeout, fall back to SQLite's own locking rather than
+        # deadlocking (e.g. two sessions writing in one thread).
+        if _writer_lock.acquire(timeout=SQLITE_BUSY_TIMEOUT_MS / 1000):
+            conn.info["holds_writer_lock"] = True
+        else:
+            logger.warning("Timed out waiting for the SQLite writer lock; continuing without it")
+
+    @event.listens_for(engine, "commit")
+    def _release_on_commit(conn):
+        _release_writer(conn.info)
+
+    @event.listens_for(engine, "rollback")
+    def _release_on_rollback(conn):
+        _release_writer(conn.info)
+
+    @event.listens_for(engine.pool, "checkin")
+    def _release_on_checkin(dbapi_connection, connection_record):
+        _release_writer(connection_record.info)
 
-# Ensure data directory exists
-Path(DB_DIR).mkdir(parents=True, exist_ok=True)
 
-engine = create_engine(
-    f"sqlite:///{DATABASE_PATH}",
-    connect_args={"check_same_thread": False},
-    echo=False,
-)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# expire_on_commit=False: attribute access after commit must not trigger lazy (blocking) loads.
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
 Base = declarative_base()
 
 
@@ -27,74 +140,14 @@ def get_db():
         db.close()
 
 
-def _migrate_auth():
-    """Add auth columns if missing. Create default user and assign orphan meds."""
-    from app.models import User
-    from app.services.auth import hash_password
-
-    with engine.connect() as conn:
-        try:
-            r = conn.execute(text("PRAGMA table_info(users)"))
-            cols = [row[1] for row in r]
-            if "password_hash" not in cols:
-                conn.execute(text("ALTER TABLE users ADD COLUMN password_hash VARCHAR(255)"))
-                conn.commit()
-        except Exception:
-            pass
-        try:
-            r = conn.execute(text("PRAGMA table_info(meds)"))
-            cols = [row[1] for row in r]
-            if "user_id" not in cols:
-                conn.execute(text("ALTER TABLE meds ADD COLUMN user_id INTEGER REFERENCES users(id)"))
-                conn.commit()
-        except Exception:
-            pass
-        for col, col_type in [("reminder_email", "VARCHAR(255)"), ("full_name", "VARCHAR(128)"), ("age", "INTEGER"), ("gender", "VARCHAR(32)"), ("height_cm", "INTEGER"), ("weight_kg", "INTEGER"), ("region", "VARCHAR(128)"), ("state", "VARCHAR(64)"), ("city", "VARCHAR(128)")]:
-            try:
-                r = conn.execute(text("PRAGMA table_info(users)"))
-                cols = [row[1] for row in r]
-                if col not in cols:
-                    conn.execute(text(f"ALTER TABLE users ADD COLUMN {col} {col_type}"))
-                    conn.commit()
-            except Exception:
-                pass
-        for col, col_type in [
-            ("canonical_name", "VARCHAR(255)"),
-            ("image_url", "VARCHAR(1024)"),
-            ("imprint", "VARCHAR(255)"),
-            ("color", "VARCHAR(128)"),
-            ("shape", "VARCHAR(128)"),
-        ]:
-            try:
-                r = conn.execute(text("PRAGMA table_info(meds)"))
-                cols = [row[1] for row in r]
-                if col not in cols:
-                    conn.execute(text(f"ALTER TABLE meds ADD COLUMN {col} {col_type}"))
-                    conn.commit()
-            except Exception:
-                pass
-
-    db = SessionLocal()
-    try:
-        auth_users = db.query(User).filter(User.password_hash.isnot(None)).first()
-        if not auth_users:
-            default = User(
-                email="migrated@pillulu.local",
-                password_hash=hash_password("changeme"),
-            )
-            db.add(default)
-            db.commit()
-            db.refresh(default)
-            db.execute(text("UPDATE meds SET user_id = :uid WHERE user_id IS NULL"), {"uid": default.id})
-            db.commit()
-    except Exception:
-        db.rollback()
-    finally:
-        db.close()
+async def get_async_db():
+    """Dependency for async FastAPI routes."""
+    async with AsyncSessionLocal() as db:
+        yield db
 
 
 def init_db():
     """Create all tables and run migrations."""
     from app import models  # noqa: F401
-    Base.metadata.create_all(bind=engine)
-    _migrate_auth()
+    from app.migrations import run_migrations
+    run_migrations(engine, Base.metadata)
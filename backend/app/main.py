@@ -7,15 +7,31 @@ from fastapi.middleware.cors import CORSMiddleware
 from starlette.middleware.sessions import SessionMiddleware
 from fastapi.staticfiles import StaticFiles
 
-from app.database import init_db
-from app.config import JWT_SECRET
+from app.database import async_engine, init_db
+from app.config import JWT_SECRET, REMINDER_SCHEDULER_ENABLED
 from app.routers import med_search, ai, pillbox, cron, notifications, auth, user_profile, weather, cases
+from app.services.email import close_email_client
+from app.services.notification_stream import notification_hub
+from app.services.outbox import outbox_worker
+from app.services.retention import retention_worker
+from app.services.scheduler import reminder_scheduler
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     init_db()
+    await outbox_worker.start()
+    await retention_worker.start()
+    notification_hub.close_on_exit_signal()
+    if REMINDER_SCHEDULER_ENABLED:
+        await reminder_scheduler.start()
     yield
+    notification_hub.close()
+    await reminder_scheduler.stop()
+    await retention_worker.stop()
+    await outbox_worker.stop()
+    await close_email_client()
+    await async_engine.dispose()
 
 
 app = FastAPI(
@@ -0,0 +1,230 @@
+"""
+Versioned schema migrations.
+
+`schema_version` holds one row per applied step. At startup `run_migrations` reads
+the current version with a single query and returns when it is up to date. When it is
+behind, it creates any missing tables and applies the pending steps in order, all in
+one transaction. Steps are written to run on both SQLite and PostgreSQL: column types
+are compiled from the models for the connected dialect.
+
+To change the schema, update app/models.py and append a step to MIGRATIONS. A step
+that only adds a new table can be a no-op, because missing tables are created
+whenever any step is pending.
+"""
+import logging
+from datetime import datetime, timedelta
+from typing import Callable
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, func, insert, inspect, select, text
+from sqlalchemy.sql import column, table
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import DBAPIError
+
+from app.database import Base
+
+logger = logging.getLogger(__name__)
+
+schema_version = Table(
+    "schema_version",
+    MetaData(),
+    Column("version", Integer, primary_key=True, autoincrement=False),
+    Column("name", String(64), nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+# Arbitrary key for pg_advisory_xact_lock, serializing migrations across instances
+_PG_MIGRATION_LOCK = 7_406_117
+
+
+def _add_columns(conn: Connection, table: str, columns: list[tuple[str, str]]) -> set[str]:
+    """
+    Add the (column, extra DDL) pairs the table is missing, typed as in app/models.py for
+    this dialect. Returns the names added.
+    """
+    existing = {c["name"] for c in inspect(conn).get_columns(table)}
+    model = Base.metadata.tables[table]
+    added = set()
+    for col, extra in columns:
+        if col not in existing:
+            col_type = model.c[col].type.compile(dialect=conn.dialect)
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {col} {col_type} {extra}".rstrip()))
+            added.add(col)
+    return added
+
+
+def _legacy_columns(conn: Connection) -> None:
+    """Columns added to pre-existing tables before migrations were versioned."""
+    _add_columns(conn, "users", [
+        ("password_hash", ""),
+        ("reminder_email", ""),
+        ("full_name", ""),
+        ("age", ""),
+        ("gender", ""),
+        ("height_cm", ""),
+        ("weight_kg", ""),
+        ("region", ""),
+        ("state", ""),
+        ("city", ""),
+    ])
+    added = _add_columns(conn, "meds", [
+        ("user_id", "REFERENCES users(id)"),
+        ("canonical_name", ""),
+        ("image_url", ""),
+        ("imprint", ""),
+        ("color", ""),
+        ("shape", ""),
+        ("low_stock_pending", "NOT NULL DEFAULT FALSE"),
+    ])
+    if "low_stock_pending" in added:
+        conn.execute(text(
+            "UPDATE meds SET low_stock_pending = "
+            "(COALESCE(stock_count, 0) <= COALESCE(low_stock_threshold, 0))"
+        ))
+    _add_columns(conn, "schedules", [
+        ("days_mask", "DEFAULT 127"),
+        ("next_fire_at_utc", ""),
+        ("claim_owner", ""),
+        ("claim_expires_at", ""),
+    ])
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_schedules_next_fire_at_utc ON schedules (next_fire_at_utc)"))
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_meds_low_stock_pending ON meds (low_stock_pending, last_low_stock_sent_at)"
+    ))
+
+
+def _default_user(conn: Connection) -> None:
+    """Create the default user and assign it orphan meds, if there are no password users yet."""
+    from app.services.auth import hash_password
+
+    # Core over the columns this step needs: the model's users table has columns later steps add
+    users = table("users", column("id"), column("email"), column("password_hash"), column("created_at"))
+    if conn.execute(select(users.c.id).where(users.c.password_hash.isnot(None)).limit(1)).first():
+        return
+    uid = conn.execute(
+        insert(users)
+        .values(email="migrated@pillulu.local", password_hash=hash_password("changeme"), created_at=datetime.utcnow())
+        .returning(users.c.id)
+    ).scalar_one()
+    conn.execute(text("UPDATE meds SET user_id = :uid WHERE user_id IS NULL"), {"uid": uid})
+
+
+def _backfill_next_fire(conn: Connection) -> None:
+    """Fill days_mask/next_fire_at_utc for enabled schedules that predate these columns."""
+    from app.services.schedule import compute_next_fire_utc, parse_days_mask
+
+    # Core over the columns this step needs, so later model changes cannot break it
+    rows = conn.execute(text(
+        "SELECT id, time_of_day, timezone, days_of_week FROM schedules "
+        "WHERE enabled = :enabled AND next_fire_at_utc IS NULL"
+    ), {"enabled": True}).all()
+    if not rows:
+        return
+    after_utc = datetime.utcnow().replace(second=0, microsecond=0) - timedelta(microseconds=1)
+    values = []
+    for schedule_id, time_of_day, tz_name, days_of_week in rows:
+        days_mask = parse_days_mask(days_of_week)
+        values.append({
+            "id": schedule_id,
+            "days_mask": days_mask,
+            "next_fire": compute_next_fire_utc(time_of_day, tz_name, days_mask, after_utc),
+        })
+    conn.execute(
+        text("UPDATE schedules SET days_mask = :days_mask, next_fire_at_utc = :next_fire WHERE id = :id"),
+        values,
+    )
+
+
+def _access_path_indexes(conn: Connection) -> None:
+    """Indexes for the hot router and cron queries (checked by scripts/check_query_plans.py)."""
+    for statement in [
+        "CREATE INDEX IF NOT EXISTS ix_schedules_med_id ON schedules (med_id)",
+        "CREATE INDEX IF NOT EXISTS ix_schedules_claim_owner ON schedules (claim_owner)",
+        "CREATE INDEX IF NOT EXISTS ix_meds_user_id_created_at ON meds (user_id, created_at)",
+        "CREATE INDEX IF NOT EXISTS ix_case_records_user_occurred_created "
+        "ON case_records (user_id, occurred_on, created_at)",
+        "CREATE INDEX IF NOT EXISTS ix_notifications_created_at ON notifications (created_at)",
+        "CREATE INDEX IF NOT EXISTS ix_notifications_read_at ON notifications (read_at)",
+        "CREATE INDEX IF NOT EXISTS ix_email_outbox_claim_token ON email_outbox (claim_token)",
+        "CREATE INDEX IF NOT EXISTS ix_cron_runs_started_at ON cron_runs (started_at)",
+        # Superseded by the composite indexes above (same leading column).
+        "DROP INDEX IF EXISTS ix_meds_user_id",
+        "DROP INDEX IF EXISTS ix_case_records_user_id",
+    ]:
+        conn.execute(text(statement))
+
+
+def _notifications_archive(conn: Connection) -> None:
+    Base.metadata.tables["notifications_archive"].create(conn, checkfirst=True)
+
+
+def _notification_owner(conn: Connection) -> None:
+    """Per-user inboxes. Older rows keep user_id NULL: they were never tied to a recipient."""
+    _add_columns(conn, "notifications", [("user_id", "REFERENCES users(id)")])
+    _add_columns(conn, "notifications_archive", [("user_id", "")])
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_notifications_user_created ON notifications (user_id, created_at, id)"
+    ))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_notifications_user_read ON notifications (user_id, read_at)"))
+    conn.execute(text("DROP INDEX IF EXISTS ix_notifications_read_at"))
+
+
+def _unread_counter(conn: Connection) -> None:
+    if "unread_notifications" in _add_columns(conn, "users", [("unread_notifications", "NOT NULL DEFAULT 0")]):
+        conn.execute(text(
+            "UPDATE users SET unread_notifications = (SELECT count(*) FROM notifications "
+            "WHERE notifications.user_id = users.id AND notifications.read_at IS NULL)"
+        ))
+
+
+MIGRATIONS: list[tuple[int, str, Callable[[Connection], None]]] = [
+    (1, "legacy_columns", _legacy_columns),
+    (2, "default_user", _default_user),
+    (3, "backfill_next_fire", _backfill_next_fire),
+    (4, "access_path_indexes", _access_path_indexes),
+    (5, "notifications_archive", _notifications_archive),
+    (6, "notification_owner", _notification_owner),
+    (7, "unread_counter", _unread_counter),
+]
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def current_version(conn: Connection) -> int:
+    try:
+        return conn.execute(select(func.max(schema_version.c.version))).scalar() or 0
+    except DBAPIError:  # no schema_version table yet
+        conn.rollback()
+        return 0
+
+
+def _lock_for_migration(conn: Connection) -> None:
+    """Make a second instance starting at the same time wait, then see the steps as applied."""
+    if conn.dialect.name == "sqlite":
+        # IMMEDIATE takes the write lock up front
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+    elif conn.dialect.name == "postgresql":
+        conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": _PG_MIGRATION_LOCK})
+
+
+def run_migrations(engine: Engine, metadata) -> int:
+    """Bring the database up to LATEST_VERSION. Returns the number of steps applied."""
+    with engine.connect() as conn:
+        if current_version(conn) >= LATEST_VERSION:
+            return 0
+        conn.rollback()
+        _lock_for_migration(conn)
+        try:
+            schema_version.create(conn, checkfirst=True)
+            version = current_version(conn)
+            pending = [step for step in MIGRATIONS if step[0] > version]
+            if pending:
+                metadata.create_all(bind=conn)
+            for step_version, name, apply in pending:
+                apply(conn)
+                conn.execute(
+                    insert(schema_version).values(version=step_version, name=name, applied_at=datetime.utcnow())
+                )
+                logger.info("Applied schema migration %d (%s)", step_version, name)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    return len(pending)
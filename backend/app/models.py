@@ -1,6 +1,6 @@
 """SQLAlchemy models for Pillulu Health Assistant."""
 from datetime import datetime, date
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Date, ForeignKey, Text
+from sqlalchemy import Column, Integer, Float, String, Boolean, DateTime, Date, ForeignKey, Text, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 
 from app.database import Base
@@ -21,6 +21,7 @@ class User(Base):
     region = Column(String(128), nullable=True)  # city/region within state (legacy: was full region)
     state = Column(String(64), nullable=True)  # US state
     city = Column(String(128), nullable=True)  # city/region within state
+    unread_notifications = Column(Integer, default=0, server_default="0", nullable=False)  # kept in step by app/services/notification.py
     created_at = Column(DateTime, default=datetime.utcnow)
 
     meds = relationship("Med", back_populates="user", cascade="all, delete-orphan")
@@ -29,8 +30,14 @@ class User(Base):
 
 class Notification(Base):
     __tablename__ = "notifications"
+    __table_args__ = (
+        Index("ix_notifications_user_created", "user_id", "created_at", "id"),  # inbox keyset pages
+        Index("ix_notifications_user_read", "user_id", "read_at"),
+        Index("ix_notifications_created_at", "created_at"),  # retention
+    )
 
     id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True)  # NULL for rows created before inboxes were per user
     type = Column(String(32), nullable=False)  # "time_to_take" | "low_stock"
     title = Column(String(255), nullable=False)
     message = Column(Text, nullable=False)
@@ -38,11 +45,28 @@ class Notification(Base):
     read_at = Column(DateTime, nullable=True)
 
 
+class NotificationArchive(Base):
+    """Compact copy of a notification moved out by the retention worker (message body dropped)."""
+    __tablename__ = "notifications_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)  # original notifications.id
+    user_id = Column(Integer, nullable=True)
+    type = Column(String(32), nullable=False)
+    title = Column(String(255), nullable=False)
+    created_at = Column(DateTime, nullable=True)
+    read_at = Column(DateTime, nullable=True)
+    archived_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
 class Med(Base):
     __tablename__ = "meds"
+    __table_args__ = (
+        Index("ix_meds_user_id_created_at", "user_id", "created_at"),  # list_meds
+        Index("ix_meds_low_stock_pending", "low_stock_pending", "last_low_stock_sent_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=True, index=True)  # nullable for migration
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True)  # nullable for migration
     name = Column(String(255), nullable=False)
     purpose = Column(String(500), nullable=True)
     dosage_notes = Column(Text, nullable=True)
@@ -56,30 +80,50 @@ class Med(Base):
     low_stock_threshold = Column(Integer, default=5)
     created_at = Column(DateTime, default=datetime.utcnow)
     last_low_stock_sent_at = Column(Date, nullable=True)  # dedupe daily low-stock emails
+    # stock_count <= low_stock_threshold, kept in sync on every write so the low-stock pass is an index read
+    low_stock_pending = Column(Boolean, default=False, nullable=False)
 
     user = relationship("User", back_populates="meds")
-    schedules = relationship("Schedule", back_populates="med", cascade="all, delete-orphan")
+    schedules = relationship("Schedule", back_populates="med", cascade="all, delete-orphan", order_by="Schedule.id")
 
 
 class Schedule(Base):
     __tablename__ = "schedules"
 
     id = Column(Integer, primary_key=True, index=True)
-    med_id = Column(Integer, ForeignKey("meds.id"), nullable=False)
+    med_id = Column(Integer, ForeignKey("meds.id"), nullable=False, index=True)
     time_of_day = Column(String(5), nullable=False)  # "08:30" 24h format
     timezone = Column(String(64), default="America/New_York")
     days_of_week = Column(String(64), default="daily")  # "mon,tue,wed" or "daily"
+    days_mask = Column(Integer, default=127)  # derived from days_of_week; bit 0 = Monday
     enabled = Column(Boolean, default=True)
-    last_reminder_sent_at = Column(DateTime, nullable=True)  # dedupe time-to-take reminders
+    next_fire_at_utc = Column(DateTime, nullable=True, index=True)  # naive UTC; NULL when disabled
+    last_reminder_sent_at = Column(DateTime, nullable=True)  # naive UTC; dedupe time-to-take reminders
+    claim_owner = Column(String(64), nullable=True, index=True)  # worker currently processing this schedule's due slot
+    claim_expires_at = Column(DateTime, nullable=True)  # naive UTC; lease end, reclaimable afterwards
 
     med = relationship("Med", back_populates="schedules")
 
 
+class ReminderFire(Base):
+    """One row per reminder slot handled, so a slot is sent at most once however often the pass runs."""
+    __tablename__ = "reminder_fires"
+    __table_args__ = (UniqueConstraint("schedule_id", "scheduled_local", name="uq_reminder_fires_schedule_slot"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    schedule_id = Column(Integer, ForeignKey("schedules.id"), nullable=False)
+    scheduled_local = Column(DateTime, nullable=False)  # wall-clock slot in the schedule's timezone
+    scheduled_utc = Column(DateTime, nullable=False)
+    status = Column(String(16), nullable=False)  # "sent" | "missed" (older than the grace period)
+    fired_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+
 class CaseRecord(Base):
     __tablename__ = "case_records"
+    __table_args__ = (Index("ix_case_records_user_occurred_created", "user_id", "occurred_on", "created_at"),)
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     title = Column(String(255), nullable=False)
     diagnosis = Column(String(500), nullable=True)
     body_part = Column(String(64), nullable=False, index=True)
@@ -91,3 +135,56 @@ class CaseRecord(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
 
     user = relationship("User", back_populates="case_records")
+
+
+class EmailOutbox(Base):
+    """Transactional outbox: reminder emails written with the reminder commit, delivered by the outbox worker."""
+    __tablename__ = "email_outbox"
+    __table_args__ = (Index("ix_email_outbox_status_next_attempt", "status", "next_attempt_at"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    ref = Column(String(64), nullable=True)  # "schedule:<id>" | "med:<id>"
+    to_email = Column(String(255), nullable=False)
+    subject = Column(String(255), nullable=False)
+    html = Column(Text, nullable=False)
+    plain = Column(Text, nullable=False)
+    status = Column(String(16), default="pending", nullable=False)  # "pending" | "sent" | "dead"
+    attempts = Column(Integer, default=0, nullable=False)
+    next_attempt_at = Column(DateTime, default=datetime.utcnow, nullable=False)  # also the claim lease expiry
+    claim_token = Column(String(32), nullable=True, index=True)
+    last_error = Column(String(255), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    sent_at = Column(DateTime, nullable=True)
+
+
+class CronRun(Base):
+    """Metrics for one reminder pass or one outbox delivery batch."""
+    __tablename__ = "cron_runs"
+    __table_args__ = (
+        Index("ix_cron_runs_kind_started_at", "kind", "started_at"),
+        Index("ix_cron_runs_started_at", "started_at"),  # metrics window and pruning span all kinds
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String(32), nullable=False)  # "reminders" | "email_delivery"
+    source = Column(String(32), nullable=False)  # "cron" | "scheduler" | "outbox"
+    started_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    duration_ms = Column(Float, nullable=True)
+    db_ms = Column(Float, nullable=True)
+    notify_ms = Column(Float, nullable=True)  # rendering + in-app notification inserts
+    email_ms = Column(Float, nullable=True)  # time waiting on the email provider
+    scanned = Column(Integer, default=0)  # schedules claimed
+    due = Column(Integer, default=0)
+    sent = Column(Integer, default=0)  # time-to-take reminders fired
+    missed = Column(Integer, default=0)  # older than the grace period
+    duplicates = Column(Integer, default=0)  # already in reminder_fires
+    low_stock = Column(Integer, default=0)
+    emails_queued = Column(Integer, default=0)
+    lag_p50_seconds = Column(Float, nullable=True)  # fire time minus scheduled minute
+    lag_p95_seconds = Column(Float, nullable=True)
+    lag_max_seconds = Column(Float, nullable=True)
+    emails_attempted = Column(Integer, default=0)
+    emails_sent = Column(Integer, default=0)
+    emails_failed = Column(Integer, default=0)  # will be retried
+    emails_dead = Column(Integer, default=0)
+    error = Column(Text, nullable=True)
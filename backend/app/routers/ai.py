@@ -3,12 +3,14 @@ from datetime import date
 import re
 
 from fastapi import APIRouter, HTTPException, Depends, Header
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import get_db
+from app.database import get_async_db
 from app.models import User, CaseRecord
 from app.schemas import AIAskRequest, AIAskResponse, AIRelatedCase
-from app.services.ai import ask_ai
+from app.services.ai import ask_ai, ai_governor, AIBusyError, DISCLAIMER
+from app.services.openfda import get_label_info
 from app.services.auth import decode_token
 
 router = APIRouter(prefix="/api/ai", tags=["ai"])
@@ -33,6 +35,61 @@ def _is_history_query(question: str) -> bool:
     return any(re.search(p, q) for p in patterns)
 
 
+_LABEL_INTENT_PATTERNS = [
+    ("use", r"^(?:what(?: is|'s| are)|whats)\s+(?P<drug>.+?)\s+(?:used for|used to treat|good for|for)$"),
+    ("use", r"^what (?:does|do)\s+(?P<drug>.+?)\s+(?:do|treat)$"),
+    ("use", r"^(?:what are the |the )?uses? (?:of|for)\s+(?P<drug>.+)$"),
+    ("use", r"^(?P<drug>.+?)\s+uses?$"),
+    ("purpose", r"^(?:what is |whats |what's )?(?:the )?purpose (?:of|for)\s+(?P<drug>.+)$"),
+    ("purpose", r"^(?P<drug>.+?)\s+purpose$"),
+    ("warnings", r"^(?:what are |any |are there any )?(?:the )?(?:warnings?|precautions?) (?:for|of|about|on)\s+(?P<drug>.+)$"),
+    ("warnings", r"^(?P<drug>.+?)\s+(?:warnings?|precautions?)$"),
+]
+_CONTEXT_PRONOUNS = {"it", "this", "this med", "this medication", "this medicine", "that"}
+
+
+def _detect_label_intent(question: str, context_med_name: str | None = None) -> tuple[str, str] | None:
+    """
+    Detect simple use / purpose / warnings questions about one named drug.
+    Returns (intent, drug_name) or None when the LLM should handle the question; the caller
+    still falls back to the LLM when no label is found for the name.
+    """
+    q = re.sub(r"\s+", " ", (question or "").strip().lower()).rstrip("?.! ")
+    if not q or len(q) > 120:
+        return None
+    for intent, pattern in _LABEL_INTENT_PATTERNS:
+        m = re.match(pattern, q)
+        if not m:
+            continue
+        drug = re.sub(r"^(?:the|a|an)\s+", "", m.group("drug").strip())
+        if drug in _CONTEXT_PRONOUNS and context_med_name:
+            drug = context_med_name.strip().lower()
+        if drug in _CONTEXT_PRONOUNS or len(drug.split()) > 4:
+            return None
+        return intent, drug
+    return None
+
+
+def _label_answer(intent: str, info: dict) -> str | None:
+    name = info.get("display_name") or ""
+    if intent == "warnings":
+        if not info.get("warnings"):
+            return None
+        return (
+            f"Label warnings for {name} (excerpt): {info['warnings']}\n"
+            "Read the full package label, and check with a pharmacist if you have other conditions or take other medications."
+        )
+    text = info.get("purpose") if intent == "purpose" else None
+    text = text or info.get("use")
+    if not text:
+        return None
+    return (
+        f"General use of {name}: {text}\n"
+        "Individual factors such as age, pregnancy, other medications, and allergies matter, "
+        "so ask a doctor or pharmacist whether it is right for you."
+    )
+
+
 def _history_answer(case_records: list[CaseRecord]) -> str:
     if not case_records:
         return (
@@ -52,9 +109,9 @@ def _history_answer(case_records: list[CaseRecord]) -> str:
     return "\n".join(lines)
 
 
-def _try_get_user(
+async def _try_get_user(
     authorization: str | None,
-    db: Session,
+    db: AsyncSession,
 ) -> User | None:
     if not authorization or not authorization.startswith("Bearer "):
         return None
@@ -65,26 +122,27 @@ def _try_get_user(
     user_id = int(payload.get("sub", 0))
     if not user_id:
         return None
-    return db.query(User).filter(User.id == user_id).first()
+    return await db.get(User, user_id)
 
 
 @router.post("/ask", response_model=AIAskResponse)
 async def ai_ask(
     req: AIAskRequest,
     authorization: str | None = Header(None),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Ask AI about medication. Returns answer with disclaimer and suggested meds."""
     try:
-        user = _try_get_user(authorization, db)
+        user = await _try_get_user(authorization, db)
         case_records: list[CaseRecord] = []
         if user:
-            case_records = (
-                db.query(CaseRecord)
-                .filter(CaseRecord.user_id == user.id)
-                .order_by(CaseRecord.occurred_on.desc().nullslast(), CaseRecord.created_at.desc())
-                .limit(40)
-                .all()
+            case_records = list(
+                await db.scalars(
+                    select(CaseRecord)
+                    .where(CaseRecord.user_id == user.id)
+                    .order_by(CaseRecord.occurred_on.desc().nullslast(), CaseRecord.created_at.desc())
+                    .limit(40)
+                )
             )
 
         if _is_history_query(req.question):
@@ -110,6 +168,22 @@ async def ai_ask(
                 auto_case=None,
             )
 
+        label_intent = _detect_label_intent(req.question, req.context_med_name)
+        if label_intent:
+            intent, drug = label_intent
+            info = await get_label_info(drug)
+            answer = _label_answer(intent, info) if info else None
+            if answer:
+                return AIAskResponse(
+                    answer=answer,
+                    disclaimer=DISCLAIMER,
+                    suggested_medications=[info["display_name"]],
+                    related_cases=[],
+                    history_context_used=False,
+                    auto_case_created=False,
+                    auto_case=None,
+                )
+
         history_for_ai = [
             {
                 "id": record.id,
@@ -123,7 +197,9 @@ async def ai_ask(
             }
             for record in case_records
         ]
-        answer, disclaimer, suggested_medications, related_case_ids, suggested_case_record = ask_ai(
+        answer, disclaimer, suggested_medications, related_case_ids, suggested_case_record = await ai_governor.run(
+            user.id if user else None,
+            ask_ai,
             req.question,
             req.context_med_name,
             history_for_ai,
@@ -165,15 +241,15 @@ async def ai_ask(
                 status = "active"
 
             if should_add and title and body_part in ALLOWED_BODY_PARTS:
-                existing = (
-                    db.query(CaseRecord)
-                    .filter(
+                existing = await db.scalar(
+                    select(CaseRecord)
+                    .where(
                         CaseRecord.user_id == user.id,
                         CaseRecord.title == title,
                         CaseRecord.body_part == body_part,
                         CaseRecord.occurred_on == date.today(),
                     )
-                    .first()
+                    .limit(1)
                 )
                 record = existing
                 if not record:
@@ -188,8 +264,8 @@ async def ai_ask(
                         notes=notes,
                     )
                     db.add(record)
-                    db.commit()
-                    db.refresh(record)
+                    await db.commit()
+                    await db.refresh(record)
                     auto_case_created = True
 
                 if record:
@@ -211,6 +287,12 @@ async def ai_ask(
             auto_case_created=auto_case_created,
             auto_case=auto_case,
         )
+    except AIBusyError as e:
+        raise HTTPException(
+            status_code=429,
+            detail="AI service is busy, please retry shortly",
+            headers={"Retry-After": str(e.retry_after)},
+        )
     except ValueError as e:
         raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
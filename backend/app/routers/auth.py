@@ -1,11 +1,14 @@
 """Auth: register, login, and OAuth/OIDC login."""
 from urllib.parse import urlencode
+import asyncio
 import secrets
 
 from authlib.integrations.starlette_client import OAuth, OAuthError
 from fastapi import APIRouter, Depends, HTTPException, Header, Request
 from fastapi.responses import RedirectResponse
 from pydantic import BaseModel, Field
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.config import (
@@ -16,7 +19,7 @@ from app.config import (
     GOOGLE_CLIENT_ID,
     GOOGLE_CLIENT_SECRET,
 )
-from app.database import get_db
+from app.database import get_async_db, get_db
 from app.models import User
 from app.services.auth import hash_password, verify_password, create_token, decode_token
 
@@ -189,7 +192,7 @@ async def oauth_google_start(request: Request):
 
 
 @router.get("/oauth/google/callback")
-async def oauth_google_callback(request: Request, db: Session = Depends(get_db)):
+async def oauth_google_callback(request: Request, db: AsyncSession = Depends(get_async_db)):
     """Handle Google OAuth callback, create/find user, issue app token, and redirect to frontend."""
     client = _get_oauth_client()
     try:
@@ -216,13 +219,14 @@ async def oauth_google_callback(request: Request, db: Session = Depends(get_db))
     if userinfo.get("email_verified") is False:
         return _build_frontend_redirect(request, error="Google login failed: email is not verified.")
 
-    user = db.query(User).filter(User.email == email).first()
+    user = await db.scalar(select(User).where(User.email == email))
     if not user:
-        # Create OAuth users with a random internal password hash.
-        user = User(email=email, password_hash=hash_password(secrets.token_urlsafe(32)))
+        # Create OAuth users with a random internal password hash (bcrypt runs off the event loop).
+        password_hash = await asyncio.to_thread(hash_password, secrets.token_urlsafe(32))
+        user = User(email=email, password_hash=password_hash)
         db.add(user)
-        db.commit()
-        db.refresh(user)
+        await db.commit()
+        await db.refresh(user)
 
     app_token = create_token(user.id, user.email)
     return _build_frontend_redirect(request, token=app_token, email=user.email)
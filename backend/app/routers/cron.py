@@ -1,14 +1,18 @@
 """Cron-friendly endpoints for reminders and stock decrement."""
-from datetime import datetime, date
-from zoneinfo import ZoneInfo
-from fastapi import APIRouter, Depends, HTTPException, Request
+from datetime import datetime, timedelta
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.database import get_db
-from app.models import Med, Schedule
-from app.config import CRON_SECRET
-from app.services.notification import create_time_to_take_notification, create_low_stock_notification
-from app.services.email import send_time_to_take_reminder, send_low_stock_reminder
+from app.database import get_async_db, get_db
+from app.models import Med, ReminderFire
+from app.config import CRON_SECRET, REMINDER_GRACE_SECONDS
+from app.services.outbox import outbox_stats, outbox_worker
+from app.services.reminders import prune_reminder_fires, run_reminder_pass
+from app.services.forecast import reminder_forecast
+from app.services.metrics import metrics_summary, prune_cron_runs, run_to_dict
+from app.services.schedule import DEFAULT_TIMEZONE, parse_days_mask, schedule_tz, utc_to_local_slot
+from app.services.stock import refresh_low_stock_pending
 
 router = APIRouter(prefix="/api/cron", tags=["cron"])
 
@@ -21,74 +25,119 @@ def verify_cron_secret(token: str | None):
 
 def _now_in_tz(tz_name: str) -> tuple[datetime, str, str]:
     """Return (now, current_hm, today_weekday) in given timezone."""
-    try:
-        tz = ZoneInfo(tz_name)
-    except Exception:
-        tz = ZoneInfo("America/New_York")
-    now = datetime.now(tz)
+    now = datetime.now(schedule_tz(tz_name))
     return now, now.strftime("%H:%M"), now.strftime("%a").lower()
 
 
-def _seconds_since(last_dt: datetime | None, now_tz: datetime) -> float:
-    """Seconds between last_dt and now_tz. Handles naive datetime from SQLite."""
-    if not last_dt:
-        return float("inf")
-    if last_dt.tzinfo is None:
-        last_dt = last_dt.replace(tzinfo=now_tz.tzinfo)
-    return (now_tz - last_dt).total_seconds()
-
-
 @router.get("/debug_reminders")
 def debug_reminders(
     request: Request,
+    limit: int = Query(default=200, ge=1, le=1000),
     db: Session = Depends(get_db),
 ):
     """
-    Debug endpoint: show which schedules would match right now.
-    Helps diagnose why reminders aren't firing. Pass ?secret=YOUR_CRON_SECRET
+    Debug endpoint: show schedules that are due now (within the catch-up grace period) and whether
+    the next pass would fire them. Pass ?secret=YOUR_CRON_SECRET. Use /reminder_forecast for later fires.
     """
     secret = request.query_params.get("secret") or request.headers.get("X-CRON-SECRET")
     if CRON_SECRET and secret != CRON_SECRET:
         raise HTTPException(status_code=403, detail="Invalid or missing cron secret")
 
-    schedules = db.query(Schedule).filter(Schedule.enabled == True).all()
+    now_utc = datetime.utcnow()
+    earliest_slot_utc = now_utc - timedelta(seconds=REMINDER_GRACE_SECONDS)
+    # Indexed range read of due and about-to-be-due schedules instead of a scan of every schedule
+    page = reminder_forecast(db, earliest_slot_utc, now_utc + timedelta(minutes=1), limit=limit)
+    logged = set(
+        db.query(ReminderFire.schedule_id, ReminderFire.scheduled_local)
+        .filter(
+            ReminderFire.schedule_id.in_([item["schedule_id"] for item in page["items"]]),
+            ReminderFire.scheduled_utc >= earliest_slot_utc,
+        )
+        .all()
+    )
     results = []
-    for s in schedules:
-        now_tz, current_hm, today_weekday = _now_in_tz(s.timezone or "America/New_York")
-        time_match = s.time_of_day == current_hm
-        days_match = True
-        if s.days_of_week != "daily":
-            days = [d.strip().lower()[:3] for d in s.days_of_week.split(",")]
-            days_match = today_weekday in days
-        dedupe_ok = _seconds_since(s.last_reminder_sent_at, now_tz) >= 180
-        would_fire = time_match and days_match and dedupe_ok
+    for item in page["items"]:
+        tz_name = item["timezone"] or DEFAULT_TIMEZONE
+        now_tz, current_hm, today_weekday = _now_in_tz(tz_name)
+        next_fire_at_utc = datetime.fromisoformat(item["next_fire_at_utc"].rstrip("Z"))
+        due = next_fire_at_utc <= now_utc
+        dedupe_ok = (item["schedule_id"], utc_to_local_slot(next_fire_at_utc, tz_name)) not in logged
         results.append({
-            "med_name": s.med.name,
-            "time_of_day": s.time_of_day,
-            "timezone": s.timezone,
-            "days_of_week": s.days_of_week,
+            "med_name": item["med_name"],
+            "time_of_day": item["time_of_day"],
+            "timezone": item["timezone"],
+            "days_of_week": item["days_of_week"],
+            "next_fire_at_utc": item["next_fire_at_utc"],
             "current_hm_in_tz": current_hm,
             "today_weekday": today_weekday,
-            "time_match": time_match,
-            "days_match": days_match,
+            "time_match": item["time_of_day"] == current_hm,
+            "days_match": bool(parse_days_mask(item["days_of_week"]) & (1 << now_tz.weekday())),
             "dedupe_ok": dedupe_ok,
-            "would_fire": would_fire,
+            "would_fire": due and dedupe_ok,
         })
-    now_ny, hm_ny, wd_ny = _now_in_tz("America/New_York")
+    now_ny, hm_ny, wd_ny = _now_in_tz(DEFAULT_TIMEZONE)
     return {
-        "server_time_utc": datetime.utcnow().isoformat() + "Z",
+        "server_time_utc": now_utc.isoformat() + "Z",
         "ny_time": now_ny.isoformat(),
         "ny_hm": hm_ny,
         "ny_weekday": wd_ny,
         "schedules": results,
-        "hint": "Cron must POST /api/cron/send_reminders every minute. Use: curl -X POST .../api/cron/send_reminders -H 'X-CRON-SECRET: YOUR_SECRET'",
+        "truncated": page["next_cursor"] is not None,
+        "hint": "Cron should POST /api/cron/send_reminders every minute (slots up to REMINDER_GRACE_SECONDS late still fire). Use: curl -X POST .../api/cron/send_reminders -H 'X-CRON-SECRET: YOUR_SECRET'",
     }
 
 
+@router.get("/reminder_forecast")
+def get_reminder_forecast(
+    request: Request,
+    hours: float = Query(default=24, gt=0, le=168),
+    limit: int = Query(default=100, ge=1, le=500),
+    cursor: str | None = Query(default=None, max_length=64),
+    user_id: int | None = None,
+    med_id: int | None = None,
+    timezone: str | None = Query(default=None, max_length=64),
+    db: Session = Depends(get_db),
+):
+    """
+    Upcoming reminder fires in the next `hours`, one page of schedules at a time ordered by next fire.
+    Filter by user_id, med_id or timezone; pass next_cursor back as ?cursor= for the next page.
+    Pass ?secret=YOUR_CRON_SECRET
+    """
+    secret = request.query_params.get("secret") or request.headers.get("X-CRON-SECRET")
+    verify_cron_secret(secret)
+    now_utc = datetime.utcnow()
+    try:
+        return reminder_forecast(
+            db,
+            now_utc,
+            now_utc + timedelta(hours=hours),
+            limit=limit,
+            cursor=cursor,
+            user_id=user_id,
+            med_id=med_id,
+            tz_name=timezone,
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+_last_log_prune = datetime.min
+
+
+def _maybe_prune_logs(db: Session, now_utc: datetime) -> None:
+    """Trim reminder_fires and cron_runs every few hours."""
+    global _last_log_prune
+    if now_utc - _last_log_prune < timedelta(hours=6):
+        return
+    _last_log_prune = now_utc
+    prune_reminder_fires(db)
+    prune_cron_runs(db)
+
+
 @router.post("/send_reminders")
 async def send_reminders(
     request: Request,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     Check due schedules and low stock, create in-app notifications.
@@ -102,71 +151,62 @@ async def send_reminders(
     secret = body.get("secret") or request.headers.get("X-CRON-SECRET")
     verify_cron_secret(secret)
 
-    today_date = date.today()
-    sent_count = 0
-    email_sent_count = 0
-
-    # Time-to-take reminders (evaluate each schedule in its timezone)
-    schedules = db.query(Schedule).filter(Schedule.enabled == True).all()
-    for s in schedules:
-        now_tz, current_hm, today_weekday = _now_in_tz(s.timezone or "America/New_York")
-        if s.time_of_day != current_hm:
-            continue
-        if s.days_of_week != "daily":
-            days = [d.strip().lower()[:3] for d in s.days_of_week.split(",")]
-            if today_weekday not in days:
-                continue
-        # Dedupe: don't send if we already sent in last 3 minutes
-        if _seconds_since(s.last_reminder_sent_at, now_tz) < 180:
-            continue
-
-        create_time_to_take_notification(db, s.med.name, s.time_of_day)
-        user_email = (
-            ((s.med.user.reminder_email or s.med.user.email) if s.med and s.med.user else "")
-            .strip()
-            .lower()
-        )
-        if user_email and send_time_to_take_reminder(user_email, s.med.name, s.time_of_day):
-            email_sent_count += 1
-        s.last_reminder_sent_at = now_tz
-        sent_count += 1
-        # Decrement stock on reminder (MVP assumption)
-        if s.med.stock_count > 0:
-            s.med.stock_count -= 1
-
-    db.commit()
-
-    # Low stock reminders (dedupe daily)
-    meds_low = db.query(Med).filter(Med.stock_count <= Med.low_stock_threshold).all()
-    for med in meds_low:
-        if med.last_low_stock_sent_at == today_date:
-            continue
-        create_low_stock_notification(db, med.name, med.stock_count, med.low_stock_threshold)
-        user_email = (
-            ((med.user.reminder_email or med.user.email) if med.user else "")
-            .strip()
-            .lower()
-        )
-        if user_email and send_low_stock_reminder(
-            user_email, med.name, med.stock_count, med.low_stock_threshold
-        ):
-            email_sent_count += 1
-        med.last_low_stock_sent_at = today_date
-        sent_count += 1
-
-    db.commit()
+    # Time-to-take reminders: due schedules are claimed in leased batches, so overlapping cron
+    # requests or several instances split the work without double sends.
+    # Slots up to REMINDER_GRACE_SECONDS late still fire (late or failed cron runs); reminder_fires
+    # makes each slot fire once. Older slots are logged as missed.
+    # One notification/email per recipient and minute (digest policy); emails go to the outbox in
+    # the same commit as the schedule update and the worker delivers them.
+    now_utc = datetime.utcnow()
+    # The pass is shared with the in-process scheduler (sync); run_sync drives it over the async
+    # connection so its queries do not block the event loop.
+    run = await db.run_sync(
+        run_reminder_pass, now_utc, earliest_slot_utc=now_utc - timedelta(seconds=REMINDER_GRACE_SECONDS)
+    )
+    outbox_worker.kick()
+    await db.run_sync(_maybe_prune_logs, now_utc)
 
     return {
-        "sent": sent_count,
-        "email_sent": email_sent_count,
+        "sent": run["sent"] + run["low_stock"],
+        "email_queued": run["emails_queued"],
+        # Deprecated alias for callers of the pre-outbox response; counts queued, not yet delivered, emails
+        "email_sent": run["emails_queued"],
         "message": "Reminders processed",
+        "run": run_to_dict(run),
     }
 
 
+@router.get("/metrics")
+def reminder_metrics(
+    request: Request,
+    hours: float = Query(default=24, gt=0, le=168),
+    recent: int = Query(default=20, ge=0, le=200),
+    db: Session = Depends(get_db),
+):
+    """
+    Reminder pipeline health from cron_runs: run durations, DB and email time, send lag,
+    failures per channel, plus the outbox backlog. Pass ?secret=YOUR_CRON_SECRET
+    """
+    secret = request.query_params.get("secret") or request.headers.get("X-CRON-SECRET")
+    verify_cron_secret(secret)
+    return {**metrics_summary(db, hours, recent), "outbox": outbox_stats(db)}
+
+
+@router.get("/email_outbox")
+def email_outbox_status(
+    request: Request,
+    db: Session = Depends(get_db),
+):
+    """Outbox health: pending / sent / dead-lettered counts. Pass ?secret=YOUR_CRON_SECRET"""
+    secret = request.query_params.get("secret") or request.headers.get("X-CRON-SECRET")
+    verify_cron_secret(secret)
+    return outbox_stats(db)
+
+
 @router.post("/decrement_stock")
 async def decrement_stock(
     request: Request,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     Optional: manually trigger stock decrement (e.g. when reminder fires).
@@ -184,11 +224,12 @@ async def decrement_stock(
     if not med_id:
         return {"ok": False, "message": "med_id required"}
 
-    med = db.query(Med).filter(Med.id == int(med_id)).first()
+    med = await db.get(Med, int(med_id))
     if not med:
         return {"ok": False, "message": "Medication not found"}
 
     if med.stock_count > 0:
         med.stock_count -= 1
-    db.commit()
+    refresh_low_stock_pending(med)
+    await db.commit()
     return {"ok": True, "stock_count": med.stock_count}
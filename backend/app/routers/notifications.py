@@ -1,37 +1,184 @@
-"""Notifications API for in-app reminders."""
-from fastapi import APIRouter, Depends
+"""Notifications API for in-app reminders. Each user sees only their own inbox."""
+import asyncio
+from datetime import datetime, timedelta
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
-from app.database import get_db
-from app.models import Notification
-from app.schemas import NotificationResponse
+from app.config import NOTIFICATION_STREAM_HEARTBEAT_SECONDS
+from app.database import AsyncSessionLocal, get_db
+from app.models import User
+from app.routers.auth import get_current_user
+from app.schemas import NotificationIds, NotificationPage, NotificationResponse, UnreadCount
+from app.services.auth import STREAM_SCOPE, STREAM_TOKEN_EXPIRE_SECONDS, create_stream_token, decode_token
+from app.services.cursor import decode_cursor, encode_cursor
+from app.services.notification import (
+    delete_notifications_before,
+    latest_notification_cursor,
+    mark_notifications_read,
+    notification_page,
+    notifications_after,
+)
+from app.services.notification_stream import CLOSE, notification_hub
 
 router = APIRouter(prefix="/api", tags=["notifications"])
 
 
-@router.get("/notifications", response_model=list[NotificationResponse])
-def list_notifications(limit: int = 50, db: Session = Depends(get_db)):
-    """List notifications, newest first."""
-    items = db.query(Notification).order_by(Notification.created_at.desc()).limit(limit).all()
-    return items
+@router.get("/notifications", response_model=NotificationPage)
+def list_notifications(
+    limit: int = Query(default=50, ge=1, le=200),
+    cursor: str | None = Query(default=None, max_length=64),
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    """List the user's notifications, newest first. Pass next_cursor back as ?cursor= for older ones."""
+    try:
+        return notification_page(db, user.id, limit=limit, cursor=cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+@router.get("/notifications/unread-count", response_model=UnreadCount)
+def unread_count(user: User = Depends(get_current_user)):
+    """Unread notifications for the badge, from the counter on the user row."""
+    return {"unread": max(0, user.unread_notifications or 0)}
 
 
 @router.put("/notifications/{id}/read")
-def mark_read(id: int, db: Session = Depends(get_db)):
+def mark_read(id: int, db: Session = Depends(get_db), user: User = Depends(get_current_user)):
     """Mark a notification as read."""
-    from datetime import datetime
-    n = db.query(Notification).filter(Notification.id == id).first()
-    if n:
-        n.read_at = datetime.utcnow()
-        db.commit()
+    mark_notifications_read(db, user.id, [id])
+    db.commit()
     return {"ok": True}
 
 
+@router.put("/notifications/read")
+def mark_read_many(body: NotificationIds, db: Session = Depends(get_db), user: User = Depends(get_current_user)):
+    """Mark the listed notifications as read. Ids that are not the user's or already read are skipped."""
+    updated = mark_notifications_read(db, user.id, body.ids)
+    db.commit()
+    return {"ok": True, "updated": updated}
+
+
 @router.put("/notifications/read-all")
-def mark_all_read(db: Session = Depends(get_db)):
-    """Mark all notifications as read."""
-    from datetime import datetime
-    for n in db.query(Notification).filter(Notification.read_at.is_(None)).all():
-        n.read_at = datetime.utcnow()
+def mark_all_read(db: Session = Depends(get_db), user: User = Depends(get_current_user)):
+    """Mark all of the user's notifications as read."""
+    updated = mark_notifications_read(db, user.id)
     db.commit()
-    return {"ok": True}
+    return {"ok": True, "updated": updated}
+
+
+@router.delete("/notifications")
+def delete_old_notifications(
+    older_than_days: int = Query(..., ge=0, le=3650),
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    """Delete the user's notifications older than older_than_days (0 clears the inbox)."""
+    deleted = delete_notifications_before(db, user.id, datetime.utcnow() - timedelta(days=older_than_days))
+    db.commit()
+    return {"ok": True, "deleted": deleted}
+
+
+@router.post("/notifications/stream-token")
+def notification_stream_token(user: User = Depends(get_current_user)):
+    """Short-lived token for ?token= on /api/notifications/stream, so the login token never goes in a URL."""
+    return {"token": create_stream_token(user.id), "expires_in": STREAM_TOKEN_EXPIRE_SECONDS}
+
+
+async def _stream_user_id(token: str | None) -> int:
+    payload = decode_token(token, scope=STREAM_SCOPE) if token else None
+    if not payload:
+        raise HTTPException(status_code=401, detail="Stream token required")
+    user_id = int(payload.get("sub", 0))
+    async with AsyncSessionLocal() as db:
+        if not user_id or await db.get(User, user_id) is None:
+            raise HTTPException(status_code=401, detail="User not found")
+    return user_id
+
+
+# created_at is stamped before the creating transaction commits, so with several writers a row
+# can become visible after rows stamped later. Each read re-scans this far behind the newest
+# row sent and skips ids already sent, so such a row is still pushed.
+STREAM_LOOKBACK = timedelta(seconds=60)
+STREAM_PAGE_SIZE = 200
+
+
+async def _read_window(user_id: int, since: datetime | None) -> list[NotificationResponse]:
+    """The user's notifications created after since, oldest first. Short-lived session per page."""
+    rows: list[NotificationResponse] = []
+    cursor = encode_cursor(since, 0) if since else None
+    async with AsyncSessionLocal() as db:
+        while True:
+            page = await db.run_sync(notifications_after, user_id, cursor, STREAM_PAGE_SIZE)
+            rows.extend(NotificationResponse.model_validate(n) for n in page)
+            if len(page) < STREAM_PAGE_SIZE:
+                return rows
+            cursor = encode_cursor(page[-1].created_at, page[-1].id)
+
+
+async def _events(user_id: int, newest: datetime | None, replay: bool):
+    # Subscribed here rather than in the endpoint: if the client is gone before the body starts,
+    # the generator never runs and there is nothing to clean up.
+    queue = notification_hub.subscribe(user_id)
+    if queue is None:
+        return
+    sent: dict[int, datetime] = {}  # ids sent within the lookback window
+    if not replay:
+        # A new stream starts at the newest row; what is already visible is not pushed.
+        sent = {n.id: n.created_at for n in await _read_window(user_id, newest and newest - STREAM_LOOKBACK)}
+    try:
+        yield "retry: 5000\n\n"
+        while True:
+            # On a reconnect the first read re-sends the lookback window: delivery is at least once.
+            for item in await _read_window(user_id, newest and newest - STREAM_LOOKBACK):
+                if item.id in sent:
+                    continue
+                sent[item.id] = item.created_at
+                newest = max(newest, item.created_at) if newest else item.created_at
+                yield f"id: {encode_cursor(item.created_at, item.id)}\nevent: notification\ndata: {item.model_dump_json()}\n\n"
+            if newest:
+                sent = {i: c for i, c in sent.items() if c >= newest - STREAM_LOOKBACK}
+            try:
+                if await asyncio.wait_for(queue.get(), timeout=NOTIFICATION_STREAM_HEARTBEAT_SECONDS) == CLOSE:
+                    return
+            except asyncio.TimeoutError:
+                # Keeps proxies from closing an idle connection. The read that follows also
+                # picks up notifications committed by another instance, which this hub never sees.
+                yield ": ping\n\n"
+    finally:
+        notification_hub.unsubscribe(user_id, queue)
+
+
+@router.get("/notifications/stream")
+async def notification_stream(
+    token: str | None = Query(default=None, max_length=2048),
+    last_event_id: str | None = Header(default=None, max_length=64),
+    last_event_id_param: str | None = Query(default=None, alias="last_event_id", max_length=64),
+):
+    """
+    Server-Sent Events: one `notification` event per new notification, with the notification as data.
+    On reconnect, the browser's Last-Event-ID header (or ?last_event_id= when the page reconnects
+    with a fresh token) replays what was missed from the table; notifications close to the last
+    one seen may be sent again. Authenticate with ?token= from POST /api/notifications/stream-token.
+    """
+    user_id = await _stream_user_id(token)
+    last_event_id = last_event_id or last_event_id_param
+    newest, replay = None, False
+    if last_event_id:
+        try:
+            newest, replay = decode_cursor(last_event_id)[0], True
+        except ValueError:  # malformed Last-Event-ID: start from now
+            pass
+    if not replay:
+        async with AsyncSessionLocal() as db:
+            cursor = await db.run_sync(latest_notification_cursor, user_id)
+        newest = decode_cursor(cursor)[0] if cursor else None
+    if notification_hub.is_full(user_id):
+        raise HTTPException(status_code=429, detail="Too many open notification streams")
+    return StreamingResponse(
+        _events(user_id, newest, replay),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,11 +1,17 @@
 """Pillbox CRUD: meds and schedules."""
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.database import get_db
+from app.database import get_async_db, get_db
 from app.models import Med, Schedule, User
 from app.routers.auth import get_current_user
 from app.services.openfda import enrich_med_visuals
+from app.services.schedule import refresh_next_fire
+from app.services.stock import refresh_low_stock_pending
+from app.services.reminders import delete_reminder_fires
+from app.services.scheduler import reminder_scheduler
 from app.schemas import (
     MedCreate,
     MedUpdate,
@@ -73,6 +79,7 @@ def create_med(body: MedCreate, db: Session = Depends(get_db), user: User = Depe
         stock_count=body.stock_count,
         low_stock_threshold=body.low_stock_threshold,
     )
+    refresh_low_stock_pending(med)
     db.add(med)
     db.commit()
     db.refresh(med)
@@ -86,8 +93,10 @@ def list_meds(db: Session = Depends(get_db), user: User = Depends(get_current_us
 
 
 @router.post("/pillbox/enrich-visuals")
-async def enrich_pillbox_visuals(db: Session = Depends(get_db), user: User = Depends(get_current_user)):
-    meds = db.query(Med).filter(Med.user_id == user.id).order_by(Med.created_at.desc()).limit(60).all()
+async def enrich_pillbox_visuals(db: AsyncSession = Depends(get_async_db), user: User = Depends(get_current_user)):
+    meds = (
+        await db.scalars(select(Med).where(Med.user_id == user.id).order_by(Med.created_at.desc()).limit(60))
+    ).all()
     updated = 0
     for med in meds:
         has_any_visual = bool(med.image_url or med.imprint or med.color or med.shape)
@@ -111,7 +120,7 @@ async def enrich_pillbox_visuals(db: Session = Depends(get_db), user: User = Dep
             updated += 1
 
     if updated > 0:
-        db.commit()
+        await db.commit()
 
     return {"ok": True, "updated": updated, "checked": len(meds)}
 
@@ -132,6 +141,8 @@ def update_med(med_id: int, body: MedUpdate, db: Session = Depends(get_db), user
     data = body.model_dump(exclude_unset=True)
     for k, v in data.items():
         setattr(med, k, v)
+    if "stock_count" in data or "low_stock_threshold" in data:
+        refresh_low_stock_pending(med)
     db.commit()
     db.refresh(med)
     return med_to_response(med)
@@ -142,8 +153,12 @@ def delete_med(med_id: int, db: Session = Depends(get_db), user: User = Depends(
     med = db.query(Med).filter(Med.id == med_id, Med.user_id == user.id).first()
     if not med:
         raise HTTPException(status_code=404, detail="Medication not found")
+    schedule_ids = [s.id for s in med.schedules]
+    delete_reminder_fires(db, schedule_ids)
     db.delete(med)
     db.commit()
+    for schedule_id in schedule_ids:
+        reminder_scheduler.notify_schedule_changed(schedule_id, None)
     return {"ok": True}
 
 
@@ -160,9 +175,11 @@ def create_schedule(med_id: int, body: ScheduleCreate, db: Session = Depends(get
         days_of_week=body.days_of_week,
         enabled=body.enabled,
     )
+    refresh_next_fire(s)
     db.add(s)
     db.commit()
     db.refresh(s)
+    reminder_scheduler.notify_schedule_changed(s.id, s.next_fire_at_utc)
     return ScheduleSchema.model_validate(s)
 
 
@@ -182,8 +199,10 @@ def update_schedule(schedule_id: int, body: ScheduleUpdate, db: Session = Depend
     data = body.model_dump(exclude_unset=True)
     for k, v in data.items():
         setattr(s, k, v)
+    refresh_next_fire(s)
     db.commit()
     db.refresh(s)
+    reminder_scheduler.notify_schedule_changed(s.id, s.next_fire_at_utc)
     return ScheduleSchema.model_validate(s)
 
 
@@ -192,6 +211,8 @@ def delete_schedule(schedule_id: int, db: Session = Depends(get_db), user: User
     s = db.query(Schedule).filter(Schedule.id == schedule_id).first()
     if not s or s.med.user_id != user.id:
         raise HTTPException(status_code=404, detail="Schedule not found")
+    delete_reminder_fires(db, [s.id])
     db.delete(s)
     db.commit()
+    reminder_scheduler.notify_schedule_changed(schedule_id, None)
     return {"ok": True}
@@ -2,7 +2,7 @@
 from datetime import datetime, date
 from typing import Optional, List
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 
 
 # --- Medication Search (OpenFDA) ---
@@ -74,6 +74,14 @@ class MedUpdate(BaseModel):
     stock_count: Optional[int] = Field(None, ge=0)
     low_stock_threshold: Optional[int] = Field(None, ge=0)
 
+    @field_validator("stock_count", "low_stock_threshold")
+    @classmethod
+    def _not_null(cls, v):
+        # omit the field to leave it unchanged; an explicit null would break the low-stock comparison
+        if v is None:
+            raise ValueError("must be a number, not null")
+        return v
+
 
 class ScheduleSchema(BaseModel):
     id: int
@@ -82,6 +90,7 @@ class ScheduleSchema(BaseModel):
     timezone: str
     days_of_week: str
     enabled: bool
+    next_fire_at_utc: Optional[datetime] = None
 
     class Config:
         from_attributes = True
@@ -163,6 +172,19 @@ class NotificationResponse(BaseModel):
         from_attributes = True
 
 
+class NotificationPage(BaseModel):
+    items: List[NotificationResponse]
+    next_cursor: Optional[str] = None  # pass back as ?cursor= for older notifications
+
+
+class NotificationIds(BaseModel):
+    ids: List[int] = Field(..., min_length=1, max_length=500)
+
+
+class UnreadCount(BaseModel):
+    unread: int
+
+
 # --- Case Records ---
 class CaseRecordCreate(BaseModel):
     title: str = Field(..., min_length=1, max_length=255)
@@ -1,10 +1,22 @@
 """OpenAI Chat Completions for medication Q&A with safety prompts."""
+import asyncio
+import functools
 import json
+import math
 import re
+import time
+from collections import OrderedDict, deque
 
 from openai import OpenAI
 
-from app.config import OPENAI_API_KEY
+from app.config import (
+    OPENAI_API_KEY,
+    OPENAI_BASE_URL,
+    AI_MAX_IN_FLIGHT,
+    AI_MAX_IN_FLIGHT_PER_USER,
+    AI_MAX_IN_FLIGHT_ANONYMOUS,
+    AI_ADMISSION_WAIT_SECONDS,
+)
 
 SYSTEM_PROMPT = """You are Pillulu, an AI-powered health assistant. Your role is to provide general, educational information about medications only. You must NEVER:
 - Provide medical advice or prescribe
@@ -60,6 +72,151 @@ If unsure, say: "Common use information is not clearly available."
 """
 
 
+class AIBusyError(Exception):
+    """Raised when an AI call cannot be admitted within the wait budget."""
+
+    def __init__(self, retry_after: int):
+        super().__init__("AI service is busy, please retry shortly")
+        self.retry_after = retry_after
+
+
+class AIConcurrencyGovernor:
+    """
+    Admission control for OpenAI calls.
+    Caps total in-flight calls and in-flight calls per lane (one lane per signed-in
+    user, one shared smaller lane for anonymous traffic). Freed slots are handed to
+    waiting lanes round-robin so a single busy caller cannot starve the others.
+    """
+
+    ANONYMOUS_LANE = "anon"
+
+    def __init__(self, max_in_flight: int, per_user: int, anonymous: int, max_wait: float):
+        self.max_in_flight = max(1, max_in_flight)
+        self.per_user = max(1, per_user)
+        self.anonymous = max(1, anonymous)
+        self.max_wait = max_wait
+        self._in_flight = 0
+        self._lane_in_flight: dict[str, int] = {}
+        self._waiters: OrderedDict[str, deque[asyncio.Future]] = OrderedDict()
+        self._avg_call_seconds = 2.0
+
+    def _lane_key(self, user_id: int | None) -> str:
+        return f"user:{user_id}" if user_id else self.ANONYMOUS_LANE
+
+    def _lane_cap(self, lane: str) -> int:
+        return self.anonymous if lane == self.ANONYMOUS_LANE else self.per_user
+
+    def _can_start(self, lane: str) -> bool:
+        return self._in_flight < self.max_in_flight and self._lane_in_flight.get(lane, 0) < self._lane_cap(lane)
+
+    def _start(self, lane: str) -> None:
+        self._in_flight += 1
+        self._lane_in_flight[lane] = self._lane_in_flight.get(lane, 0) + 1
+
+    def _release(self, lane: str) -> None:
+        self._in_flight = max(0, self._in_flight - 1)
+        remaining = self._lane_in_flight.get(lane, 0) - 1
+        if remaining > 0:
+            self._lane_in_flight[lane] = remaining
+        else:
+            self._lane_in_flight.pop(lane, None)
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        """Grant free slots to waiting lanes, one per lane per round."""
+        granted = True
+        while granted and self._in_flight < self.max_in_flight:
+            granted = False
+            for lane in list(self._waiters.keys()):
+                queue = self._waiters[lane]
+                while queue and queue[0].done():
+                    queue.popleft()
+                if not queue:
+                    del self._waiters[lane]
+                    continue
+                if not self._can_start(lane):
+                    continue
+                self._start(lane)
+                queue.popleft().set_result(None)
+                if queue:
+                    self._waiters.move_to_end(lane)
+                else:
+                    del self._waiters[lane]
+                granted = True
+                break
+
+    def _queued(self) -> int:
+        return sum(len(q) for q in self._waiters.values())
+
+    def retry_after_seconds(self) -> int:
+        """Rough estimate of when a slot should be free, for the Retry-After header."""
+        estimate = self._avg_call_seconds * (self._queued() + 1) / self.max_in_flight
+        return max(1, min(30, math.ceil(estimate)))
+
+    async def _acquire(self, lane: str, max_wait: float) -> None:
+        if lane not in self._waiters and self._can_start(lane):
+            self._start(lane)
+            return
+        if max_wait <= 0:
+            raise AIBusyError(self.retry_after_seconds())
+        fut = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(lane, deque()).append(fut)
+        try:
+            await asyncio.wait_for(fut, timeout=max_wait)
+        except asyncio.TimeoutError:
+            raise AIBusyError(self.retry_after_seconds()) from None
+        except BaseException:
+            # Cancelled after being granted a slot: hand it back.
+            if fut.done() and not fut.cancelled():
+                self._release(lane)
+            raise
+
+    async def run(
+        self,
+        user_id: int | None,
+        fn,
+        *args,
+        max_wait: float | None = None,
+        timeout: float | None = None,
+    ):
+        """
+        Run the blocking call fn(*args) in a worker thread under one slot. Raises AIBusyError
+        after the bounded wait. The slot is held until the thread returns, even when the caller
+        times out or is cancelled, so the caps bound the calls really in flight upstream.
+        """
+        lane = self._lane_key(user_id)
+        await self._acquire(lane, self.max_wait if max_wait is None else max_wait)
+        started = time.monotonic()
+
+        def finished(_):
+            elapsed = time.monotonic() - started
+            self._avg_call_seconds = 0.8 * self._avg_call_seconds + 0.2 * elapsed
+            self._release(lane)
+
+        call = asyncio.get_running_loop().run_in_executor(None, functools.partial(fn, *args))
+        call.add_done_callback(finished)
+        return await asyncio.wait_for(asyncio.shield(call), timeout=timeout)
+
+
+ai_governor = AIConcurrencyGovernor(
+    max_in_flight=AI_MAX_IN_FLIGHT,
+    per_user=AI_MAX_IN_FLIGHT_PER_USER,
+    anonymous=AI_MAX_IN_FLIGHT_ANONYMOUS,
+    max_wait=AI_ADMISSION_WAIT_SECONDS,
+)
+
+
+_client: OpenAI | None = None
+
+
+def _get_client() -> OpenAI:
+    """Shared OpenAI client (reuses its HTTP connection pool across calls)."""
+    global _client
+    if _client is None:
+        _client = OpenAI(api_key=OPENAI_API_KEY, base_url=OPENAI_BASE_URL or None)
+    return _client
+
+
 def _parse_ai_response(raw: str) -> tuple[str, list[str], list[int], dict]:
     """Parse AI response. Expects JSON with answer, meds, related_case_ids, suggested_case_record."""
     raw = raw.strip()
@@ -107,7 +264,7 @@ def ask_ai(
     history_context_text = json.dumps(case_history_context or [], ensure_ascii=False)
     user_content = f"{user_content}\n\nKnown case history records (may be empty): {history_context_text}"
 
-    client = OpenAI(api_key=OPENAI_API_KEY)
+    client = _get_client()
     response = client.chat.completions.create(
         model="gpt-4o-mini",
         messages=[
@@ -121,10 +278,10 @@ def ask_ai(
     return answer, DISCLAIMER, suggested_medications, related_case_ids, suggested_case_record
 
 
-def get_general_use_summary(med_name: str, canonical_name: str | None = None) -> str:
+def get_general_use_summary(med_name: str, canonical_name: str | None = None, timeout: float | None = None) -> str:
     """
     Generate a concise general-use sentence for a medication.
-    Returns plain text; raises on API/config errors.
+    Returns plain text; raises on API/config errors. timeout bounds the HTTP call (no retries).
     """
     if not OPENAI_API_KEY:
         raise ValueError("OPENAI_API_KEY is not configured")
@@ -133,7 +290,9 @@ def get_general_use_summary(med_name: str, canonical_name: str | None = None) ->
     if canonical_name and canonical_name.strip().lower() != med_name.strip().lower():
         context = f"{med_name.strip()} (canonical: {canonical_name.strip()})"
 
-    client = OpenAI(api_key=OPENAI_API_KEY)
+    client = _get_client()
+    if timeout is not None:
+        client = client.with_options(timeout=timeout, max_retries=0)
     response = client.chat.completions.create(
         model="gpt-4o-mini",
         messages=[
@@ -8,6 +8,8 @@ from app.config import JWT_SECRET
 
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_DAYS = 30
+STREAM_TOKEN_EXPIRE_SECONDS = 60
+STREAM_SCOPE = "notification_stream"
 
 
 def hash_password(password: str) -> str:
@@ -24,8 +26,20 @@ def create_token(user_id: int, email: str) -> str:
     return jwt.encode(payload, JWT_SECRET, algorithm=ALGORITHM)
 
 
-def decode_token(token: str) -> dict | None:
+def create_stream_token(user_id: int) -> str:
+    """
+    Short-lived token for opening GET /api/notifications/stream, which takes it in the URL
+    (EventSource cannot send headers). It is not accepted anywhere a login token is.
+    """
+    expire = datetime.utcnow() + timedelta(seconds=STREAM_TOKEN_EXPIRE_SECONDS)
+    payload = {"sub": str(user_id), "scope": STREAM_SCOPE, "exp": expire}
+    return jwt.encode(payload, JWT_SECRET, algorithm=ALGORITHM)
+
+
+def decode_token(token: str, scope: str | None = None) -> dict | None:
+    """Payload of a valid token with this scope; login tokens have none."""
     try:
-        return jwt.decode(token, JWT_SECRET, algorithms=[ALGORITHM])
+        payload = jwt.decode(token, JWT_SECRET, algorithms=[ALGORITHM])
     except JWTError:
         return None
+    return payload if payload.get("scope") == scope else None
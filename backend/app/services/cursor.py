@@ -0,0 +1,12 @@
+"""Keyset pagination cursors: an opaque "timestamp|id" string for the last row of a page."""
+from datetime import datetime
+
+
+def encode_cursor(at: datetime, row_id: int) -> str:
+    return f"{at.isoformat()}|{row_id}"
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """Raises ValueError for a malformed cursor."""
+    at, _, row_id = cursor.partition("|")
+    return datetime.fromisoformat(at), int(row_id)
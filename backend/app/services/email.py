@@ -1,36 +1,131 @@
 """Resend email service for reminders."""
+import asyncio
+
 import httpx
 
-from app.config import RESEND_API_KEY, FROM_EMAIL, APP_BASE_URL
+from app.config import (
+    RESEND_API_KEY,
+    FROM_EMAIL,
+    APP_BASE_URL,
+    EMAIL_SEND_CONCURRENCY,
+    RESEND_BASE_URL,
+    RESEND_BATCH_SIZE,
+)
+
+RESEND_EMAILS_URL = f"{RESEND_BASE_URL}/emails"
+RESEND_BATCH_URL = f"{RESEND_BASE_URL}/emails/batch"
+
+# (to_email, subject, html_content, plain_content)
+EmailMessage = tuple[str, str, str, str]
+
+_async_client: httpx.AsyncClient | None = None
+
+
+def email_delivery_configured() -> bool:
+    return bool(RESEND_API_KEY and FROM_EMAIL)
+
+
+def _resend_headers() -> dict[str, str]:
+    return {
+        "Authorization": f"Bearer {RESEND_API_KEY}",
+        "Content-Type": "application/json",
+    }
+
+
+def _resend_payload(to_email: str, subject: str, html_content: str, plain_content: str) -> dict:
+    return {
+        "from": FROM_EMAIL,
+        "to": [to_email],
+        "subject": subject,
+        "html": html_content,
+        "text": plain_content,
+    }
+
 
+def _get_async_client() -> httpx.AsyncClient:
+    """Pooled client shared by async sends (keep-alive connections to Resend)."""
+    global _async_client
+    if _async_client is None or _async_client.is_closed:
+        limits = httpx.Limits(max_connections=EMAIL_SEND_CONCURRENCY, max_keepalive_connections=EMAIL_SEND_CONCURRENCY)
+        _async_client = httpx.AsyncClient(timeout=12.0, limits=limits)
+    return _async_client
 
-def send_email(to_email: str, subject: str, html_content: str, plain_content: str) -> bool:
-    """Send email via Resend. Returns True on success."""
+
+async def close_email_client() -> None:
+    global _async_client
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
+
+
+async def send_email_async(to_email: str, subject: str, html_content: str, plain_content: str) -> bool:
+    """Send one email via Resend using the pooled client. Returns True on success."""
     if not RESEND_API_KEY or not FROM_EMAIL or not to_email:
         return False
     try:
-        response = httpx.post(
-            "https://api.resend.com/emails",
-            headers={
-                "Authorization": f"Bearer {RESEND_API_KEY}",
-                "Content-Type": "application/json",
-            },
-            json={
-                "from": FROM_EMAIL,
-                "to": [to_email],
-                "subject": subject,
-                "html": html_content,
-                "text": plain_content,
-            },
-            timeout=12.0,
+        response = await _get_async_client().post(
+            RESEND_EMAILS_URL,
+            headers=_resend_headers(),
+            json=_resend_payload(to_email, subject, html_content, plain_content),
         )
         return 200 <= response.status_code < 300
     except Exception:
         return False
 
 
-def send_time_to_take_reminder(to_email: str, med_name: str, time_str: str) -> bool:
-    """Send 'time to take' reminder email."""
+async def _send_batch_chunk(chunk: list[EmailMessage], semaphore: asyncio.Semaphore) -> list[bool]:
+    """One Resend batch call; per-message results. Falls back to single sends if the batch call fails."""
+    async with semaphore:
+        try:
+            response = await _get_async_client().post(
+                RESEND_BATCH_URL,
+                headers={**_resend_headers(), "x-batch-validation": "permissive"},
+                json=[_resend_payload(*m) for m in chunk],
+            )
+        except Exception:
+            response = None
+    if response is not None and 200 <= response.status_code < 300:
+        results = [True] * len(chunk)
+        try:
+            body = response.json()
+        except ValueError:
+            body = {}
+        # Permissive mode reports rejected messages by index; the rest were accepted.
+        for error in (body.get("errors") or []) if isinstance(body, dict) else []:
+            index = error.get("index") if isinstance(error, dict) else None
+            if isinstance(index, int) and 0 <= index < len(chunk):
+                results[index] = False
+        return results
+
+    async def _single(message: EmailMessage) -> bool:
+        async with semaphore:
+            return await send_email_async(*message)
+
+    return list(await asyncio.gather(*[_single(m) for m in chunk]))
+
+
+async def send_emails_batched(messages: list[EmailMessage]) -> list[bool]:
+    """
+    Send emails through Resend's batch endpoint, RESEND_BATCH_SIZE per request.
+    Results keep input order so callers can map them back to schedules/meds.
+    """
+    results = [False] * len(messages)
+    if not RESEND_API_KEY or not FROM_EMAIL:
+        return results
+    indexed = [(i, m) for i, m in enumerate(messages) if m[0]]
+    if not indexed:
+        return results
+    semaphore = asyncio.Semaphore(EMAIL_SEND_CONCURRENCY)
+    chunks = [indexed[i:i + RESEND_BATCH_SIZE] for i in range(0, len(indexed), RESEND_BATCH_SIZE)]
+    chunk_results = await asyncio.gather(*[_send_batch_chunk([m for _, m in c], semaphore) for c in chunks])
+    for chunk, outcome in zip(chunks, chunk_results):
+        for (index, _), ok in zip(chunk, outcome):
+            results[index] = ok
+    return results
+
+
+def render_time_to_take_reminder(to_email: str, med_name: str, time_str: str) -> EmailMessage:
+    """Build the 'time to take' reminder email."""
     subject = f"Medication Reminder: {med_name} at {time_str}"
     plain = (
         "Hello,\n\n"
@@ -67,11 +162,11 @@ def send_time_to_take_reminder(to_email: str, med_name: str, time_str: str) -> b
       </div>
     </div>
     """
-    return send_email(to_email, subject, html, plain)
+    return to_email, subject, html, plain
 
 
-def send_low_stock_reminder(to_email: str, med_name: str, stock_count: int, threshold: int) -> bool:
-    """Send low stock reminder email."""
+def render_low_stock_reminder(to_email: str, med_name: str, stock_count: int, threshold: int) -> EmailMessage:
+    """Build the low stock reminder email."""
     subject = f"⚠️ Low stock alert - {med_name}"
     plain = f"Hello!\n\n{med_name} is running low.\nCurrent stock: {stock_count}\nAlert threshold: {threshold}\n\nPlease restock soon.\n\nView My Pillbox: {APP_BASE_URL}\n\n---\nPillulu Health Assistant"
     html = f"""
@@ -84,4 +179,83 @@ def send_low_stock_reminder(to_email: str, med_name: str, stock_count: int, thre
     <hr>
     <p style="font-size:12px;color:#666;">Pillulu Health Assistant</p>
     """
-    return send_email(to_email, subject, html, plain)
+    return to_email, subject, html, plain
+
+
+def render_reminder_digest(
+    to_email: str,
+    due: list[tuple[str, str]],
+    low_stock: list[tuple[str, int, int]],
+) -> EmailMessage:
+    """Build one email for several reminders: due is [(med_name, time_str)], low_stock is [(med_name, stock, threshold)]."""
+    if due:
+        if len(due) == 1:
+            subject = f"Medication Reminder: {due[0][0]} at {due[0][1]}"
+        elif len({time_str for _, time_str in due}) == 1:
+            subject = f"Medication Reminder: {len(due)} medications at {due[0][1]}"
+        else:
+            subject = f"Medication Reminder: {len(due)} medications due now"
+        if low_stock:
+            subject += f" (+{len(low_stock)} low stock)"
+    else:
+        subject = f"⚠️ Low stock alert - {len(low_stock)} medications"
+
+    plain_lines = ["Hello,", ""]
+    if due:
+        plain_lines += ["This is your medication reminder.", "", "What to take:"]
+        plain_lines += [f"- {name} at {time_str}" for name, time_str in due]
+        plain_lines += ["", "Please take your medication as scheduled.", ""]
+    if low_stock:
+        plain_lines += ["Running low:"]
+        plain_lines += [f"- {name}: {stock} left (alert threshold: {threshold})" for name, stock, threshold in low_stock]
+        plain_lines += ["", "Please restock soon.", ""]
+    plain_lines += [
+        f"View My Pillbox: {APP_BASE_URL}",
+        "",
+        "Best regards,",
+        "Pillulu Health Assistant",
+        "",
+        "For reference only. This is not medical advice.",
+    ]
+    plain = "\n".join(plain_lines)
+
+    due_html = ""
+    if due:
+        items = "".join(
+            f'<li style="margin:0 0 6px 0;"><strong>{name}</strong> at {time_str}</li>' for name, time_str in due
+        )
+        due_html = f"""
+          <p style="margin:0 0 16px 0;font-size:15px;">This is a reminder for your scheduled medications.</p>
+          <div style="background:#f8fafc;border:1px solid #e2e8f0;border-radius:10px;padding:14px 16px;margin:0 0 18px 0;">
+            <p style="margin:0 0 8px 0;font-size:15px;"><strong>What to take:</strong></p>
+            <ul style="margin:0;padding-left:20px;font-size:15px;">{items}</ul>
+          </div>"""
+    low_html = ""
+    if low_stock:
+        items = "".join(
+            f'<li style="margin:0 0 6px 0;"><strong>{name}</strong>: {stock} left (alert threshold: {threshold})</li>'
+            for name, stock, threshold in low_stock
+        )
+        low_html = f"""
+          <div style="background:#fff7ed;border:1px solid #fed7aa;border-radius:10px;padding:14px 16px;margin:0 0 18px 0;">
+            <p style="margin:0 0 8px 0;font-size:15px;"><strong>⚠️ Running low:</strong></p>
+            <ul style="margin:0;padding-left:20px;font-size:15px;">{items}</ul>
+            <p style="margin:8px 0 0 0;font-size:14px;">Please restock soon.</p>
+          </div>"""
+    html = f"""
+    <div style="margin:0;padding:24px;background:#f4f7fb;font-family:Arial,sans-serif;color:#1f2937;">
+      <div style="max-width:560px;margin:0 auto;background:#ffffff;border:1px solid #e5e7eb;border-radius:12px;overflow:hidden;">
+        <div style="background:#2563eb;padding:16px 20px;">
+          <h2 style="margin:0;font-size:20px;line-height:1.3;color:#ffffff;">Medication Reminder</h2>
+        </div>
+        <div style="padding:20px;">
+          <p style="margin:0 0 14px 0;font-size:15px;">Hello,</p>{due_html}{low_html}
+          <a href="{APP_BASE_URL}" style="display:inline-block;background:#2563eb;color:#ffffff;text-decoration:none;padding:10px 16px;border-radius:8px;font-weight:600;">View My Pillbox</a>
+
+          <p style="margin:22px 0 6px 0;font-size:14px;color:#4b5563;">Best regards,<br>Pillulu Health Assistant</p>
+          <p style="margin:0;font-size:12px;color:#6b7280;">For reference only. This is not medical advice.</p>
+        </div>
+      </div>
+    </div>
+    """
+    return to_email, subject, html, plain
@@ -0,0 +1,88 @@
+"""
+Reminder forecast: upcoming fires in a time window, for debugging and capacity planning.
+
+Reads schedules by an indexed range on next_fire_at_utc, keyset-paginated on
+(next_fire_at_utc, id), so a page never loads more than `limit` schedules.
+"""
+from datetime import datetime
+
+from app.models import Med, Schedule
+from app.services.cursor import decode_cursor, encode_cursor
+from app.services.schedule import upcoming_fires_utc
+
+
+def reminder_forecast(
+    db,
+    start_utc: datetime,
+    end_utc: datetime,
+    limit: int = 100,
+    cursor: str | None = None,
+    user_id: int | None = None,
+    med_id: int | None = None,
+    tz_name: str | None = None,
+) -> dict:
+    """
+    One page of enabled schedules whose next fire falls in [start_utc, end_utc), each with every
+    fire time inside the window. next_cursor is None on the last page.
+    """
+    query = (
+        db.query(
+            Schedule.id,
+            Schedule.med_id,
+            Schedule.time_of_day,
+            Schedule.timezone,
+            Schedule.days_of_week,
+            Schedule.days_mask,
+            Schedule.next_fire_at_utc,
+            Med.name,
+            Med.user_id,
+        )
+        .join(Med, Schedule.med_id == Med.id)
+        .filter(
+            Schedule.enabled == True,
+            Schedule.next_fire_at_utc >= start_utc,
+            Schedule.next_fire_at_utc < end_utc,
+        )
+    )
+    if user_id is not None:
+        query = query.filter(Med.user_id == user_id)
+    if med_id is not None:
+        query = query.filter(Schedule.med_id == med_id)
+    if tz_name:
+        query = query.filter(Schedule.timezone == tz_name)
+    if cursor:
+        after_fire_at, after_id = decode_cursor(cursor)
+        query = query.filter(
+            (Schedule.next_fire_at_utc > after_fire_at)
+            | ((Schedule.next_fire_at_utc == after_fire_at) & (Schedule.id > after_id))
+        )
+    rows = query.order_by(Schedule.next_fire_at_utc, Schedule.id).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    fires = upcoming_fires_utc(
+        [(r.id, r.time_of_day, r.timezone, r.days_mask or 0) for r in rows], start_utc, end_utc
+    )
+    items = [
+        {
+            "schedule_id": r.id,
+            "med_id": r.med_id,
+            "med_name": r.name,
+            "user_id": r.user_id,
+            "time_of_day": r.time_of_day,
+            "timezone": r.timezone,
+            "days_of_week": r.days_of_week,
+            "next_fire_at_utc": r.next_fire_at_utc.isoformat() + "Z",
+            # next_fire_at_utc may be an earlier, not yet fired slot than the computed ones
+            "fires_utc": [
+                f.isoformat() + "Z" for f in sorted({r.next_fire_at_utc, *fires.get(r.id, [])})
+            ],
+        }
+        for r in rows
+    ]
+    return {
+        "window_start_utc": start_utc.isoformat() + "Z",
+        "window_end_utc": end_utc.isoformat() + "Z",
+        "items": items,
+        "next_cursor": encode_cursor(rows[-1].next_fire_at_utc, rows[-1].id) if has_more else None,
+    }
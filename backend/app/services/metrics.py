@@ -0,0 +1,132 @@
+"""
+Reminder pipeline metrics. Each reminder pass and each outbox delivery batch records
+one cron_runs row (counts, DB/email time, send lag) so a falling-behind pipeline
+shows up in GET /api/cron/metrics.
+"""
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from app.config import CRON_RUN_RETENTION_DAYS
+from app.models import CronRun
+
+_COUNTERS = (
+    "scanned", "due", "sent", "missed", "duplicates", "low_stock", "emails_queued",
+    "emails_attempted", "emails_sent", "emails_failed", "emails_dead",
+)
+_TIMINGS = ("db_ms", "notify_ms", "email_ms")
+
+
+def percentile(values: list[float], q: float) -> float | None:
+    """Nearest-rank percentile (q in 0..1), None for no values."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(q * (len(ordered) - 1))))]
+
+
+def _round(value: float | None) -> float | None:
+    return round(value, 3) if value is not None else None
+
+
+class RunMetrics:
+    def __init__(self, kind: str, source: str):
+        self.kind = kind
+        self.source = source
+        self.started_at = datetime.utcnow()
+        self._t0 = time.perf_counter()
+        self.counts = dict.fromkeys(_COUNTERS, 0)
+        self.timings_ms = dict.fromkeys(_TIMINGS, 0.0)
+        self.lags: list[float] = []
+        self.error: str | None = None
+
+    def add(self, name: str, n: int = 1) -> None:
+        self.counts[name] += n
+
+    @contextmanager
+    def timed(self, name: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings_ms[name] += (time.perf_counter() - t0) * 1000
+
+    def record_lags(self, slots_utc: list[datetime]) -> None:
+        now = datetime.utcnow()
+        self.lags.extend((now - slot).total_seconds() for slot in slots_utc)
+
+    def values(self) -> dict:
+        return {
+            "kind": self.kind,
+            "source": self.source,
+            "started_at": self.started_at,
+            "duration_ms": round((time.perf_counter() - self._t0) * 1000, 1),
+            **{name: round(ms, 1) for name, ms in self.timings_ms.items()},
+            **self.counts,
+            "lag_p50_seconds": _round(percentile(self.lags, 0.5)),
+            "lag_p95_seconds": _round(percentile(self.lags, 0.95)),
+            "lag_max_seconds": _round(max(self.lags) if self.lags else None),
+            "error": self.error,
+        }
+
+    def save(self, db) -> dict:
+        """Persist as a cron_runs row (commits). Returns the recorded values."""
+        values = self.values()
+        db.add(CronRun(**values))
+        db.commit()
+        return values
+
+
+def run_to_dict(values: dict) -> dict:
+    return {**values, "started_at": values["started_at"].isoformat() + "Z"}
+
+
+def metrics_summary(db, hours: float, recent: int) -> dict:
+    """Aggregate cron_runs over the last `hours`, plus the most recent runs."""
+    since = datetime.utcnow() - timedelta(hours=hours)
+    runs = (
+        db.query(CronRun)
+        .filter(CronRun.started_at >= since)
+        .order_by(CronRun.started_at.desc())
+        .all()
+    )
+    reminder_runs = [r for r in runs if r.kind == "reminders"]
+    email_runs = [r for r in runs if r.kind == "email_delivery"]
+    lag_p95 = [r.lag_p95_seconds for r in reminder_runs if r.lag_p95_seconds is not None]
+    return {
+        "window_hours": hours,
+        "reminders": {
+            "runs": len(reminder_runs),
+            "failed_runs": sum(1 for r in reminder_runs if r.error),
+            "last_run_at": reminder_runs[0].started_at.isoformat() + "Z" if reminder_runs else None,
+            "duration_ms_p95": percentile([r.duration_ms for r in reminder_runs if r.duration_ms is not None], 0.95),
+            "db_ms_p95": percentile([r.db_ms for r in reminder_runs if r.db_ms is not None], 0.95),
+            "scanned": sum(r.scanned or 0 for r in reminder_runs),
+            "sent": sum(r.sent or 0 for r in reminder_runs),
+            "missed": sum(r.missed or 0 for r in reminder_runs),
+            "low_stock": sum(r.low_stock or 0 for r in reminder_runs),
+            "emails_queued": sum(r.emails_queued or 0 for r in reminder_runs),
+            # p95 of the per-run p95 send lag, and the single worst lag seen
+            "lag_p95_seconds": percentile(lag_p95, 0.95),
+            "lag_max_seconds": max((r.lag_max_seconds for r in reminder_runs if r.lag_max_seconds is not None), default=None),
+        },
+        "email_delivery": {
+            "batches": len(email_runs),
+            "attempted": sum(r.emails_attempted or 0 for r in email_runs),
+            "sent": sum(r.emails_sent or 0 for r in email_runs),
+            "failed": sum(r.emails_failed or 0 for r in email_runs),
+            "dead": sum(r.emails_dead or 0 for r in email_runs),
+            "email_ms_p95": percentile([r.email_ms for r in email_runs if r.email_ms is not None], 0.95),
+        },
+        "recent_runs": [
+            run_to_dict({c.name: getattr(r, c.name) for c in CronRun.__table__.columns if c.name != "id"})
+            for r in runs[:recent]
+        ],
+    }
+
+
+def prune_cron_runs(db, older_than_days: int = CRON_RUN_RETENTION_DAYS) -> int:
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    deleted = db.query(CronRun).filter(CronRun.started_at < cutoff).delete(synchronize_session=False)
+    db.commit()
+    return deleted
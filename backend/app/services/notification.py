@@ -1,24 +1,175 @@
-"""In-app notification service. Same content as email templates for future sync."""
+"""
+In-app notification service. Same content as email templates for future sync.
+
+users.unread_notifications is kept in step with the notifications table: every write that
+creates, reads or deletes unread rows adjusts it in the same transaction, so the unread
+badge is a primary-key read instead of a count over the inbox.
+
+New notifications are pushed to the recipients' open streams (app/services/notification_stream.py)
+once the session that created them commits.
+"""
+from collections import Counter
 from datetime import datetime
 
-from app.models import Notification
+from sqlalchemy import bindparam, case, delete, event, insert, update
+from sqlalchemy.orm import Session
+
+from app.models import Notification, User
+from app.services.cursor import decode_cursor, encode_cursor
+from app.services.notification_stream import notification_hub
+
+_PENDING_PUSH = "notification_push"  # Session.info key: recipients to wake after commit
+
+
+def _push_after_commit(db, user_ids) -> None:
+    db.info.setdefault(_PENDING_PUSH, set()).update(u for u in user_ids if u is not None)
+
 
+@event.listens_for(Session, "after_commit")
+def _publish_committed(session) -> None:
+    user_ids = session.info.pop(_PENDING_PUSH, None)
+    if user_ids:
+        notification_hub.publish(user_ids)
 
-def create_time_to_take_notification(db, med_name: str, time_str: str) -> Notification:
-    """Create 'time to take' reminder notification. Caller must commit."""
+
+@event.listens_for(Session, "after_rollback")
+def _drop_uncommitted(session) -> None:
+    session.info.pop(_PENDING_PUSH, None)
+
+
+def time_to_take_notification_values(med_name: str, time_str: str) -> dict:
     title = f"⏰ Time to take {med_name}"
     message = f"It's {time_str} — time to take {med_name}. Please take your medication as scheduled."
-    n = Notification(type="time_to_take", title=title, message=message)
-    db.add(n)
-    db.flush()  # Get ID without committing
-    return n
+    return {"type": "time_to_take", "title": title, "message": message}
 
 
-def create_low_stock_notification(db, med_name: str, stock_count: int, threshold: int) -> Notification:
-    """Create low stock reminder notification. Caller must commit."""
+def low_stock_notification_values(med_name: str, stock_count: int, threshold: int) -> dict:
     title = f"⚠️ Low stock - {med_name}"
     message = f"{med_name} is running low. Current stock: {stock_count}, alert threshold: {threshold}. Please restock soon."
-    n = Notification(type="low_stock", title=title, message=message)
-    db.add(n)
-    db.flush()
-    return n
+    return {"type": "low_stock", "title": title, "message": message}
+
+
+def _join_names(names: list[str]) -> str:
+    return names[0] if len(names) == 1 else ", ".join(names[:-1]) + f" and {names[-1]}"
+
+
+def digest_notification_values(due: list[tuple[str, str]], low_stock: list[tuple[str, int, int]]) -> dict:
+    """One notification for several reminders (same content as the digest email)."""
+    parts = []
+    if due:
+        if len({time_str for _, time_str in due}) == 1:
+            parts.append(f"It's {due[0][1]} — time to take {_join_names([name for name, _ in due])}.")
+        else:
+            parts.append(f"Time to take {_join_names([f'{name} ({time_str})' for name, time_str in due])}.")
+    if low_stock:
+        low = ", ".join(f"{name} ({stock} left)" for name, stock, _ in low_stock)
+        parts.append(f"Running low: {low}. Please restock soon.")
+    if due:
+        title = f"⏰ Time to take {len(due)} medications" if len(due) > 1 else f"⏰ Time to take {due[0][0]}"
+        return {"type": "time_to_take", "title": title, "message": " ".join(parts)}
+    return {"type": "low_stock", "title": f"⚠️ Low stock - {len(low_stock)} medications", "message": " ".join(parts)}
+
+
+def bulk_create_notifications(db, rows: list[dict]) -> int:
+    """Insert many notifications (dicts from the *_values helpers) in one executemany. Caller must commit."""
+    if not rows:
+        return 0
+    now = datetime.utcnow()
+    # title is VARCHAR(255), which PostgreSQL enforces; long med names must not fail the whole pass
+    db.execute(insert(Notification), [{**row, "title": row["title"][:255], "created_at": now} for row in rows])
+    recipients = Counter(row.get("user_id") for row in rows)
+    adjust_unread(db, recipients)
+    _push_after_commit(db, recipients)
+    return len(rows)
+
+
+def adjust_unread(db, deltas: dict[int | None, int]) -> None:
+    """
+    Add {user_id: delta} to the users' unread counters in one executemany. The increment
+    happens in SQL, so concurrent writers do not lose updates; users are updated in id
+    order so two transactions never wait on each other's rows in opposite order. The counter
+    never goes below 0.
+    """
+    params = [
+        {"uid": user_id, "delta": delta}
+        for user_id, delta in sorted((u, d) for u, d in deltas.items() if u is not None and d)
+    ]
+    if not params:
+        return
+    users = User.__table__
+    adjusted = users.c.unread_notifications + bindparam("delta")
+    db.execute(
+        update(users)
+        .where(users.c.id == bindparam("uid"))
+        .values(unread_notifications=case((adjusted < 0, 0), else_=adjusted)),
+        params,
+    )
+
+
+def mark_notifications_read(db, user_id: int, ids: list[int] | None = None) -> int:
+    """Mark the user's unread notifications (all, or only ids) read in one UPDATE. Caller must commit."""
+    stmt = update(Notification).where(Notification.user_id == user_id, Notification.read_at.is_(None))
+    if ids is not None:
+        stmt = stmt.where(Notification.id.in_(ids))
+    result = db.execute(stmt.values(read_at=datetime.utcnow()).execution_options(synchronize_session=False))
+    adjust_unread(db, {user_id: -result.rowcount})
+    return result.rowcount
+
+
+def delete_notifications_before(db, user_id: int, cutoff: datetime) -> int:
+    """Delete the user's notifications created before cutoff. Caller must commit."""
+    read_at = db.execute(
+        delete(Notification)
+        .where(Notification.user_id == user_id, Notification.created_at < cutoff)
+        .returning(Notification.read_at)
+        .execution_options(synchronize_session=False)
+    ).scalars().all()
+    adjust_unread(db, {user_id: -sum(1 for r in read_at if r is None)})
+    return len(read_at)
+
+
+def notification_page(db, user_id: int, limit: int = 50, cursor: str | None = None) -> dict:
+    """
+    One page of a user's inbox, newest first. Keyset on (created_at, id) so every page is a
+    range read of ix_notifications_user_created. Raises ValueError for a malformed cursor.
+    """
+    query = db.query(Notification).filter(Notification.user_id == user_id)
+    if cursor:
+        before_created_at, before_id = decode_cursor(cursor)
+        query = query.filter(
+            (Notification.created_at < before_created_at)
+            | ((Notification.created_at == before_created_at) & (Notification.id < before_id))
+        )
+    rows = query.order_by(Notification.created_at.desc(), Notification.id.desc()).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return {
+        "items": rows,
+        "next_cursor": encode_cursor(rows[-1].created_at, rows[-1].id) if has_more else None,
+    }
+
+
+def latest_notification_cursor(db, user_id: int) -> str | None:
+    """Cursor of the user's newest notification, where a new stream starts."""
+    row = (
+        db.query(Notification.created_at, Notification.id)
+        .filter(Notification.user_id == user_id)
+        .order_by(Notification.created_at.desc(), Notification.id.desc())
+        .first()
+    )
+    return encode_cursor(row.created_at, row.id) if row else None
+
+
+def notifications_after(db, user_id: int, cursor: str | None, limit: int = 50) -> list[Notification]:
+    """
+    The user's notifications newer than cursor, oldest first: what a stream has not sent yet.
+    Raises ValueError for a malformed cursor.
+    """
+    query = db.query(Notification).filter(Notification.user_id == user_id)
+    if cursor:
+        after_created_at, after_id = decode_cursor(cursor)
+        query = query.filter(
+            (Notification.created_at > after_created_at)
+            | ((Notification.created_at == after_created_at) & (Notification.id > after_id))
+        )
+    return query.order_by(Notification.created_at, Notification.id).limit(limit).all()
@@ -0,0 +1,94 @@
+"""
+In-process pub/sub behind GET /api/notifications/stream.
+
+Each open stream subscribes a queue for its user. When a session commits new notifications,
+app/services/notification.py publishes the recipients' ids and every matching queue gets a
+wake-up; the stream then reads the new rows from the table after its last event id. A queue
+holds at most one pending wake-up, so a slow or stalled client never buffers more than that,
+and nothing is lost: the table, not the queue, is the source of events.
+"""
+import asyncio
+import signal
+import threading
+from collections import defaultdict
+
+from app.config import NOTIFICATION_STREAM_MAX_PER_USER
+
+CLOSE = "close"
+WAKE = "wake"
+
+
+class NotificationHub:
+    def __init__(self, max_per_user: int):
+        self.max_per_user = max_per_user
+        self._subscribers: dict[int, set[asyncio.Queue]] = defaultdict(set)
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    def is_full(self, user_id: int) -> bool:
+        return len(self._subscribers.get(user_id, ())) >= self.max_per_user
+
+    def subscribe(self, user_id: int) -> asyncio.Queue | None:
+        """Register a stream. Call on the event loop. Returns None when the user has too many open."""
+        if self.is_full(user_id):
+            return None
+        self._loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=1)
+        self._subscribers[user_id].add(queue)
+        return queue
+
+    def unsubscribe(self, user_id: int, queue: asyncio.Queue) -> None:
+        subscribers = self._subscribers.get(user_id)
+        if subscribers is None:
+            return
+        subscribers.discard(queue)
+        if not subscribers:
+            del self._subscribers[user_id]
+
+    def publish(self, user_ids) -> None:
+        """Wake the streams of these users. Safe from any thread; a no-op with no streams open."""
+        loop = self._loop
+        if not self._subscribers or loop is None or loop.is_closed():
+            return
+        loop.call_soon_threadsafe(self._wake, set(user_ids))
+
+    def close(self) -> None:
+        """End every open stream (on shutdown, so the server does not wait on them)."""
+        for subscribers in self._subscribers.values():
+            for queue in subscribers:
+                _offer(queue, CLOSE, replace=True)
+
+    def close_on_exit_signal(self) -> None:
+        """
+        uvicorn waits for open responses to finish before it runs lifespan shutdown, and a stream
+        never finishes on its own. Chain onto the server's SIGINT/SIGTERM handlers to end the
+        streams as soon as shutdown starts. Call from the lifespan, on the event loop.
+        """
+        if threading.current_thread() is not threading.main_thread():
+            return  # signal handlers can only be set from the main thread (e.g. not under TestClient)
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            previous = signal.getsignal(sig)
+            if not callable(previous):
+                continue
+
+            def handler(signum, frame, previous=previous):
+                loop.call_soon_threadsafe(self.close)
+                previous(signum, frame)
+
+            signal.signal(sig, handler)
+
+    def _wake(self, user_ids: set[int]) -> None:
+        for user_id in user_ids:
+            for queue in self._subscribers.get(user_id, ()):
+                _offer(queue, WAKE)
+
+
+def _offer(queue: asyncio.Queue, message: str, replace: bool = False) -> None:
+    if queue.full():
+        if not replace:
+            return  # a wake-up is already pending
+        queue.get_nowait()
+    queue.put_nowait(message)
+
+
+notification_hub = NotificationHub(max_per_user=NOTIFICATION_STREAM_MAX_PER_USER)
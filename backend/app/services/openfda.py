@@ -7,7 +7,7 @@ from typing import Any, Dict, List, Optional
 import httpx
 
 from app.config import OPENAI_API_KEY
-from app.services.ai import get_general_use_summary
+from app.services.ai import get_general_use_summary, ai_governor
 from app.schemas import MedSearchResult
 
 OPENFDA_URL = "https://api.fda.gov/drug/label.json"
@@ -58,6 +58,12 @@ _SUGGEST_CACHE_TTL_SECONDS = 180.0
 _SUGGEST_CACHE_MAX_ENTRIES = 400
 _AI_GENERAL_USE_CACHE: Dict[str, tuple[float, str]] = {}
 _AI_GENERAL_USE_CACHE_TTL_SECONDS = 24 * 3600.0
+_LABEL_CACHE: Dict[str, tuple[float, Dict[str, Optional[str]]]] = {}
+_LABEL_CACHE_TTL_SECONDS = 24 * 3600.0
+_LABEL_CACHE_MAX_ENTRIES = 2000
+# Names openFDA had no label for, so repeated questions about them do not refetch
+_LABEL_MISS_CACHE: Dict[str, float] = {}
+_LABEL_MISS_CACHE_TTL_SECONDS = 3600.0
 
 
 def _normalize_name(value: str) -> str:
@@ -122,13 +128,16 @@ async def _ai_general_use_fallback(
         return cached[1]
 
     try:
-        summary = await asyncio.wait_for(
-            asyncio.to_thread(
-                get_general_use_summary,
-                display_name,
-                canonical_name or generic_name or substance_name,
-            ),
-            timeout=4.0,
+        # Search traffic is anonymous; if the AI lane is saturated, skip the fallback quickly.
+        # The client timeout stops the upstream call itself; wait_for is only a backstop.
+        summary = await ai_governor.run(
+            None,
+            get_general_use_summary,
+            display_name,
+            canonical_name or generic_name or substance_name,
+            4.0,
+            max_wait=1.0,
+            timeout=5.0,
         )
         summary = _first_sentence(summary, max_len=220)
         if not summary:
@@ -139,6 +148,101 @@ async def _ai_general_use_fallback(
         return None
 
 
+def _remember_label(names: List[Optional[str]], info: Dict[str, Optional[str]]) -> None:
+    """Cache openFDA label snippets seen during search so simple questions can be answered locally."""
+    now = time.time()
+    for name in names:
+        key = _normalize_name(name or "")
+        if key:
+            _LABEL_CACHE[key] = (now, info)
+    while len(_LABEL_CACHE) > _LABEL_CACHE_MAX_ENTRIES:
+        oldest_key = min(_LABEL_CACHE.keys(), key=lambda k: _LABEL_CACHE[k][0])
+        _LABEL_CACHE.pop(oldest_key, None)
+
+
+def _label_snippets(item: dict) -> tuple[Optional[str], Optional[str], Optional[str]]:
+    """(use, purpose, warnings) excerpts from one openFDA label record."""
+    indications = item.get("indications_and_usage", [])
+    purpose = item.get("purpose", [])
+    warnings = item.get("warnings", [])
+    purpose_snippet = _first_sentence(str(purpose[0]), max_len=300) if purpose else None
+    use_snippet = _first_sentence(str(indications[0]), max_len=300) if indications else purpose_snippet
+    return use_snippet, purpose_snippet, warnings[0][:300] if warnings else None
+
+
+def get_local_label_info(name: str) -> Optional[Dict[str, Optional[str]]]:
+    """
+    Return cached label snippets (display_name, use, purpose, warnings) for a medication,
+    filling "use" from _GENERAL_USE_FALLBACKS when needed. No network calls.
+    """
+    key = _normalize_name(name)
+    if not key:
+        return None
+    canonical = _ALIAS_TO_CANONICAL.get(key, key)
+    info: Dict[str, Optional[str]] = {"display_name": None, "use": None, "purpose": None, "warnings": None}
+    now = time.time()
+    for candidate in [key, canonical]:
+        cached = _LABEL_CACHE.get(candidate)
+        if cached and now - cached[0] <= _LABEL_CACHE_TTL_SECONDS:
+            for field, value in cached[1].items():
+                if value and not info.get(field):
+                    info[field] = value
+    if not info["use"] and canonical in _GENERAL_USE_FALLBACKS:
+        info["use"] = _GENERAL_USE_FALLBACKS[canonical]
+    if not any(info[f] for f in ["use", "purpose", "warnings"]):
+        return None
+    if not info["display_name"]:
+        info["display_name"] = canonical
+    return info
+
+
+async def get_label_info(name: str) -> Optional[Dict[str, Optional[str]]]:
+    """
+    get_local_label_info, plus one openFDA label lookup by exact generic or brand name when no
+    label is cached for the name (a general-use fallback alone has no purpose or warnings).
+    The label is cached for later questions; so is a miss.
+    """
+    key = _normalize_name(name)
+    canonical = _ALIAS_TO_CANONICAL.get(key, key)
+    now = time.time()
+    if len(key) < 3 or any(
+        now - _LABEL_CACHE[k][0] <= _LABEL_CACHE_TTL_SECONDS for k in {key, canonical} if k in _LABEL_CACHE
+    ):
+        return get_local_label_info(name)
+    missed_at = _LABEL_MISS_CACHE.get(key)
+    if missed_at and now - missed_at <= _LABEL_MISS_CACHE_TTL_SECONDS:
+        return get_local_label_info(name)
+    term = f'"{_build_term(canonical)}"'
+    async with httpx.AsyncClient(timeout=4.0) as client:
+        responses = await asyncio.gather(
+            *[_fetch_one_field(field, term, 1, client) for field in ["generic_name", "brand_name"]],
+            return_exceptions=True,
+        )
+    if all(isinstance(resp, Exception) for resp in responses):
+        return get_local_label_info(name)  # openFDA unreachable; not a miss
+    item = next((resp[0] for resp in responses if not isinstance(resp, Exception) and resp), None)
+    if item is None:
+        _LABEL_MISS_CACHE[key] = now
+        while len(_LABEL_MISS_CACHE) > _LABEL_CACHE_MAX_ENTRIES:
+            _LABEL_MISS_CACHE.pop(min(_LABEL_MISS_CACHE.keys(), key=_LABEL_MISS_CACHE.__getitem__), None)
+        return get_local_label_info(name)
+    openfda = item.get("openfda", {})
+    brand = _get_first_str(openfda.get("brand_name"))
+    generic = _get_first_str(openfda.get("generic_name"))
+    substance = _get_first_str(openfda.get("substance_name"))
+    use, purpose, warnings = _label_snippets(item)
+    _remember_label(
+        [key, canonical, generic, brand, substance],
+        {
+            "display_name": _display_name(brand, generic, substance) or key,
+            "use": use,
+            "purpose": purpose,
+            "warnings": warnings,
+        },
+    )
+    return get_local_label_info(key)
+
+
 def _candidate_attempts(term: str) -> List[Optional[int]]:
     attempts: List[Optional[int]] = [None]
     if len(term) >= 5:
@@ -366,15 +470,8 @@ async def search_medications(query: str, limit: int = 10) -> List[MedSearchResul
                         continue
                     seen_canonical.add(canonical_key)
 
-                    warnings = item.get("warnings", [])
-                    warnings_snippet = warnings[0][:300] if warnings else None
-                    use_snippet = None
-                    indications = item.get("indications_and_usage", [])
-                    purpose = item.get("purpose", [])
-                    if indications:
-                        use_snippet = _first_sentence(str(indications[0]), max_len=300)
-                    elif purpose:
-                        use_snippet = _first_sentence(str(purpose[0]), max_len=300)
+                    label_use, purpose_snippet, warnings_snippet = _label_snippets(item)
+                    use_snippet = label_use
                     if not use_snippet:
                         for candidate in [canonical_name, generic, substance, display_name]:
                             key = _normalize_name(candidate or "")
@@ -387,6 +484,18 @@ async def search_medications(query: str, limit: int = 10) -> List[MedSearchResul
                             use_snippet = ai_summary
                         ai_use_calls += 1
 
+                    # Only label text is cached: /api/ai/ask answers from this cache as label data,
+                    # so the AI summary above must not end up here.
+                    _remember_label(
+                        [canonical_name, generic, brand, substance],
+                        {
+                            "display_name": display_name,
+                            "use": label_use,
+                            "purpose": purpose_snippet,
+                            "warnings": warnings_snippet,
+                        },
+                    )
+
                     visual = {"image_url": None, "imprint": None, "color": None, "shape": None}
                     resolved_rxcui = rxcui or await _resolve_best_rxcui(
                         [display_name, canonical_name, generic, substance], client, rxcui_cache
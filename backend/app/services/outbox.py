@@ -0,0 +1,236 @@
+"""
+Durable email outbox. Reminder emails are inserted in the same transaction as the
+reminder itself; OutboxWorker delivers them in the background with retries,
+exponential backoff and dead-lettering, so no reminder email is lost when Resend is
+slow or down, and the cron request never waits on the provider.
+"""
+import asyncio
+import logging
+import random
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, insert
+
+from app.config import (
+    OUTBOX_POLL_SECONDS,
+    OUTBOX_MAX_ATTEMPTS,
+    OUTBOX_BACKOFF_BASE_SECONDS,
+    OUTBOX_RETENTION_DAYS,
+    RESEND_BATCH_SIZE,
+)
+from app.database import SessionLocal
+from app.models import EmailOutbox
+from app.services.email import email_delivery_configured, send_emails_batched
+from app.services.metrics import RunMetrics
+
+logger = logging.getLogger(__name__)
+
+CLAIM_LEASE_SECONDS = 120
+MAX_BACKOFF_SECONDS = 6 * 3600
+
+
+def enqueue_emails(db, emails: list[tuple[str, tuple[str, str, str, str]]]) -> int:
+    """Add (ref, message) pairs to the outbox. Caller commits together with the reminder rows."""
+    if not email_delivery_configured():
+        return 0
+    if not emails:
+        return 0
+    now = datetime.utcnow()
+    db.execute(
+        insert(EmailOutbox),
+        [
+            {
+                "ref": ref,
+                "to_email": to_email,
+                "subject": subject[:255],
+                "html": html,
+                "plain": plain,
+                "status": "pending",
+                "attempts": 0,
+                "next_attempt_at": now,
+                "created_at": now,
+            }
+            for ref, (to_email, subject, html, plain) in emails
+        ],
+    )
+    return len(emails)
+
+
+def _backoff(attempts: int) -> timedelta:
+    seconds = min(MAX_BACKOFF_SECONDS, OUTBOX_BACKOFF_BASE_SECONDS * (2 ** max(0, attempts - 1)))
+    return timedelta(seconds=seconds * random.uniform(0.8, 1.2))
+
+
+def claim_due(db, limit: int) -> list[EmailOutbox]:
+    """
+    Claim up to limit due pending rows. The claim pushes next_attempt_at out by a lease,
+    so rows claimed by a worker that crashes mid-send become due again later.
+    """
+    now = datetime.utcnow()
+    ids = [
+        row_id
+        for (row_id,) in db.query(EmailOutbox.id)
+        .filter(EmailOutbox.status == "pending", EmailOutbox.next_attempt_at <= now)
+        .order_by(EmailOutbox.next_attempt_at)
+        .limit(limit)
+        .all()
+    ]
+    if not ids:
+        return []
+    token = uuid.uuid4().hex
+    db.query(EmailOutbox).filter(
+        EmailOutbox.id.in_(ids),
+        EmailOutbox.status == "pending",
+        EmailOutbox.next_attempt_at <= now,
+    ).update(
+        {
+            EmailOutbox.claim_token: token,
+            EmailOutbox.next_attempt_at: now + timedelta(seconds=CLAIM_LEASE_SECONDS),
+        },
+        synchronize_session=False,
+    )
+    db.commit()
+    return db.query(EmailOutbox).filter(EmailOutbox.claim_token == token).all()
+
+
+def record_results(db, rows: list[EmailOutbox], results: list[bool]) -> tuple[int, int, int]:
+    """Mark rows sent, reschedule with backoff, or dead-letter. Returns (sent, retried, dead)."""
+    now = datetime.utcnow()
+    sent = retried = dead = 0
+    for row, ok in zip(rows, results):
+        row.claim_token = None
+        row.attempts = (row.attempts or 0) + 1
+        if ok:
+            row.status = "sent"
+            row.sent_at = now
+            row.last_error = None
+            sent += 1
+        elif row.attempts >= OUTBOX_MAX_ATTEMPTS:
+            row.status = "dead"
+            row.last_error = "delivery failed; max attempts reached"
+            dead += 1
+        else:
+            row.next_attempt_at = now + _backoff(row.attempts)
+            row.last_error = "delivery failed"
+            retried += 1
+    db.commit()
+    return sent, retried, dead
+
+
+def prune_sent(db, older_than_days: int = OUTBOX_RETENTION_DAYS) -> int:
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    deleted = (
+        db.query(EmailOutbox)
+        .filter(EmailOutbox.status == "sent", EmailOutbox.sent_at < cutoff)
+        .delete(synchronize_session=False)
+    )
+    db.commit()
+    return deleted
+
+
+def outbox_stats(db) -> dict:
+    counts = dict(db.query(EmailOutbox.status, func.count(EmailOutbox.id)).group_by(EmailOutbox.status).all())
+    oldest_pending = (
+        db.query(func.min(EmailOutbox.created_at)).filter(EmailOutbox.status == "pending").scalar()
+    )
+    return {
+        "pending": counts.get("pending", 0),
+        "sent": counts.get("sent", 0),
+        "dead": counts.get("dead", 0),
+        "oldest_pending_created_at": oldest_pending.isoformat() + "Z" if oldest_pending else None,
+    }
+
+
+class OutboxWorker:
+    def __init__(self, poll_seconds: float, batch_size: int):
+        self.poll_seconds = poll_seconds
+        self.batch_size = batch_size
+        self._wake: asyncio.Event | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._task: asyncio.Task | None = None
+        self._last_prune = datetime.min
+
+    async def start(self) -> None:
+        if self._task and not self._task.done():
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if not self._task:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self._loop = None
+
+    def kick(self) -> None:
+        """Wake the worker after new rows are committed. Safe from any thread."""
+        loop = self._loop
+        if loop is None or loop.is_closed() or self._wake is None:
+            return
+        loop.call_soon_threadsafe(self._wake.set)
+
+    def _claim(self) -> list[EmailOutbox]:
+        db = SessionLocal()
+        try:
+            rows = claim_due(db, self.batch_size)
+            db.expunge_all()
+            return rows
+        finally:
+            db.close()
+
+    def _record(self, row_ids: list[int], results: list[bool], metrics: RunMetrics) -> None:
+        db = SessionLocal()
+        try:
+            with metrics.timed("db_ms"):
+                by_id = {r.id: r for r in db.query(EmailOutbox).filter(EmailOutbox.id.in_(row_ids)).all()}
+                pairs = [(by_id[i], ok) for i, ok in zip(row_ids, results) if i in by_id]
+                sent, retried, dead = record_results(db, [row for row, _ in pairs], [ok for _, ok in pairs])
+            metrics.add("emails_sent", sent)
+            metrics.add("emails_failed", retried)
+            metrics.add("emails_dead", dead)
+            metrics.save(db)
+            if datetime.utcnow() - self._last_prune > timedelta(hours=1):
+                prune_sent(db)
+                self._last_prune = datetime.utcnow()
+        finally:
+            db.close()
+
+    async def deliver_once(self) -> int:
+        """Claim and deliver one batch. Returns the number of rows attempted."""
+        metrics = RunMetrics("email_delivery", "outbox")
+        with metrics.timed("db_ms"):
+            rows = await asyncio.to_thread(self._claim)
+        if not rows:
+            return 0
+        metrics.add("emails_attempted", len(rows))
+        with metrics.timed("email_ms"):
+            results = await send_emails_batched([(r.to_email, r.subject, r.html, r.plain) for r in rows])
+        await asyncio.to_thread(self._record, [r.id for r in rows], results, metrics)
+        return len(rows)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                self._wake.clear()
+                attempted = await self.deliver_once()
+                if attempted >= self.batch_size:
+                    continue  # backlog: keep draining
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=self.poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Email outbox delivery failed")
+                await asyncio.sleep(self.poll_seconds)
+
+
+outbox_worker = OutboxWorker(poll_seconds=OUTBOX_POLL_SECONDS, batch_size=RESEND_BATCH_SIZE * 4)
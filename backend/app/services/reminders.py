@@ -0,0 +1,409 @@
+"""
+Reminder processing shared by the cron endpoint and the in-process scheduler.
+
+Set-based: one joined read per pass, bulk notification inserts and bulk UPDATEs, so
+the number of SQL round trips stays constant as the number of due reminders grows.
+Due schedules are claimed in leased batches (claim_owner / claim_expires_at) before
+they are fired, so concurrent passes never process the same slot twice, and every
+slot handled is logged in reminder_fires so a slot is never sent twice at all.
+A pass collects ReminderItems first; notify_reminders then coalesces them per
+recipient and minute into digests before writing notifications and rendering emails.
+"""
+import os
+import socket
+import uuid
+from collections import Counter
+from datetime import datetime, date, timedelta
+from typing import NamedTuple
+
+from sqlalchemy import bindparam, insert, select, update
+
+from app.config import (
+    REMINDER_CLAIM_BATCH_SIZE,
+    REMINDER_CLAIM_LEASE_SECONDS,
+    REMINDER_DIGEST_MIN_ITEMS,
+    REMINDER_DIGEST_INCLUDE_LOW_STOCK,
+    REMINDER_FIRE_LOG_RETENTION_DAYS,
+)
+from app.models import Med, ReminderFire, Schedule, User
+from app.services.notification import (
+    bulk_create_notifications,
+    digest_notification_values,
+    time_to_take_notification_values,
+    low_stock_notification_values,
+)
+from app.services.email import (
+    EmailMessage,
+    render_reminder_digest,
+    render_time_to_take_reminder,
+    render_low_stock_reminder,
+)
+from app.services.metrics import RunMetrics
+from app.services.outbox import enqueue_emails
+from app.services.schedule import compute_next_fire_utc, parse_days_mask, utc_to_local_slot
+from app.services.stock import decremented_stock_values
+
+# (ref, message) where ref is "schedule:<id>", "med:<id>" or "digest:<first ref>+<n>" so deliveries trace back to rows
+ReminderEmail = tuple[str, EmailMessage]
+
+class ReminderItem(NamedTuple):
+    ref: str  # "schedule:<id>" | "med:<id>"
+    kind: str  # "time_to_take" | "low_stock"
+    user_id: int | None
+    recipient: str  # "" when the user has no email address
+    slot_utc: datetime | None  # minute the reminder is due; None for low-stock alerts
+    med_name: str
+    time_of_day: str = ""
+    stock_count: int = 0
+    threshold: int = 0
+
+
+def _recipient_email(reminder_email: str | None, email: str | None) -> str:
+    return (reminder_email or email or "").strip().lower()
+
+
+def _decrement_stock(db, fired_per_med: Counter) -> None:
+    """Decrement stock once per fired reminder, never below zero: one UPDATE per distinct count."""
+    by_count: dict[int, list[int]] = {}
+    for med_id, n in fired_per_med.items():
+        by_count.setdefault(n, []).append(med_id)
+    for n, med_ids in by_count.items():
+        db.execute(
+            update(Med)
+            .where(Med.id.in_(med_ids))
+            .values(decremented_stock_values(n))
+            .execution_options(synchronize_session=False)
+        )
+
+
+# Advance and release in one statement, only while we still hold the claim
+_advance_claimed = (
+    update(Schedule.__table__)
+    .where(Schedule.__table__.c.id == bindparam("b_id"), Schedule.__table__.c.claim_owner == bindparam("b_owner"))
+    .values(
+        days_mask=bindparam("b_days_mask"),
+        next_fire_at_utc=bindparam("b_next_fire_at_utc"),
+        claim_owner=None,
+        claim_expires_at=None,
+    )
+)
+
+
+def new_claim_owner() -> str:
+    return f"{socket.gethostname()[:32]}:{os.getpid()}:{uuid.uuid4().hex[:12]}"
+
+
+def claim_due_schedules(
+    db,
+    now_utc: datetime,
+    owner: str,
+    limit: int = REMINDER_CLAIM_BATCH_SIZE,
+    schedule_ids: list[int] | None = None,
+) -> int:
+    """
+    Atomically claim up to limit due schedules that are unclaimed or whose lease expired.
+    The conditional UPDATE is the claim: a row can only be won by one owner. Commits; returns the count.
+    """
+    lease_now = datetime.utcnow()
+    claimable = (
+        (Schedule.enabled == True)
+        & (Schedule.next_fire_at_utc <= now_utc)
+        & (Schedule.claim_expires_at.is_(None) | (Schedule.claim_expires_at <= lease_now))
+    )
+    # Ordered by user so a recipient's reminders usually land in one batch (and one digest)
+    due = select(Schedule.id).join(Med, Schedule.med_id == Med.id).where(claimable)
+    if schedule_ids is not None:
+        due = due.where(Schedule.id.in_(schedule_ids))
+    # On PostgreSQL, skip rows a concurrent claim has locked instead of waiting on them and then
+    # claiming nothing; a 0-row claim would end this pass while due rows remain (SQLite ignores this)
+    due = due.order_by(Med.user_id, Schedule.id).limit(limit).with_for_update(skip_locked=True, of=Schedule)
+    result = db.execute(
+        update(Schedule)
+        .where(Schedule.id.in_(due), claimable)
+        .values(claim_owner=owner, claim_expires_at=lease_now + timedelta(seconds=REMINDER_CLAIM_LEASE_SECONDS))
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return result.rowcount or 0
+
+
+def fire_due_schedules(
+    db,
+    now_utc: datetime,
+    earliest_slot_utc: datetime,
+    owner: str,
+    metrics: RunMetrics | None = None,
+) -> tuple[int, list[ReminderItem], set[int]]:
+    """
+    Fire the time-to-take reminders claimed by owner (see claim_due_schedules), advance their
+    next_fire_at_utc and release the claims. A slot is sent unless reminder_fires already has it;
+    slots older than earliest_slot_utc (the grace period) are logged as missed without sending.
+    Returns (sent, items, fired_med_ids); pass items to notify_reminders. Caller must commit.
+    """
+    query = (
+        db.query(
+            Schedule.id,
+            Schedule.med_id,
+            Schedule.time_of_day,
+            Schedule.timezone,
+            Schedule.days_of_week,
+            Schedule.next_fire_at_utc,
+            Schedule.last_reminder_sent_at,
+            Med.name,
+            Med.user_id,
+            User.reminder_email,
+            User.email,
+        )
+        .join(Med, Schedule.med_id == Med.id)
+        .outerjoin(User, Med.user_id == User.id)
+        .filter(Schedule.claim_owner == owner, Schedule.next_fire_at_utc <= now_utc)
+    )
+
+    rows = query.all()
+    if metrics:
+        metrics.add("due", len(rows))
+    if not rows:
+        return 0, [], set()
+    logged = set(
+        db.query(ReminderFire.schedule_id, ReminderFire.scheduled_local)
+        .filter(ReminderFire.schedule_id.in_([row.id for row in rows]))
+        .filter(ReminderFire.scheduled_utc >= min(row.next_fire_at_utc for row in rows))
+        .all()
+    )
+
+    advance: list[dict] = []
+    fire_log: list[dict] = []
+    fired_ids: list[int] = []
+    fired_per_med: Counter = Counter()
+    items: list[ReminderItem] = []
+    for row in rows:
+        days_mask = parse_days_mask(row.days_of_week)
+        advance.append({
+            "b_id": row.id,
+            "b_owner": owner,
+            "b_days_mask": days_mask,
+            "b_next_fire_at_utc": compute_next_fire_utc(row.time_of_day, row.timezone, days_mask, now_utc),
+        })
+        slot_local = utc_to_local_slot(row.next_fire_at_utc, row.timezone)
+        if (row.id, slot_local) in logged:
+            if metrics:
+                metrics.add("duplicates")
+            continue
+        missed = row.next_fire_at_utc < earliest_slot_utc
+        fire_log.append({
+            "schedule_id": row.id,
+            "scheduled_local": slot_local,
+            "scheduled_utc": row.next_fire_at_utc,
+            "status": "missed" if missed else "sent",
+            "fired_at": now_utc,
+        })
+        if missed:
+            if metrics:
+                metrics.add("missed")
+            continue
+
+        items.append(ReminderItem(
+            ref=f"schedule:{row.id}",
+            kind="time_to_take",
+            user_id=row.user_id,
+            recipient=_recipient_email(row.reminder_email, row.email),
+            slot_utc=row.next_fire_at_utc.replace(second=0, microsecond=0),
+            med_name=row.name,
+            time_of_day=row.time_of_day,
+        ))
+        fired_ids.append(row.id)
+        fired_per_med[row.med_id] += 1
+
+    db.execute(_advance_claimed, advance)
+    if fire_log:
+        # Unique (schedule_id, scheduled_local): a concurrent duplicate fails the whole batch
+        db.execute(insert(ReminderFire), fire_log)
+    if fired_ids:
+        db.execute(
+            update(Schedule)
+            .where(Schedule.id.in_(fired_ids))
+            .values(last_reminder_sent_at=now_utc)
+            .execution_options(synchronize_session=False)
+        )
+        # Decrement stock on reminder (MVP assumption)
+        _decrement_stock(db, fired_per_med)
+    return len(fired_ids), items, set(fired_per_med)
+
+
+def process_low_stock_alerts(db, today: date, med_ids: set[int] | None = None) -> tuple[int, list[ReminderItem]]:
+    """
+    Low stock reminders, deduped daily. Reads only low_stock_pending meds not yet alerted today
+    (ix_meds_low_stock_pending), then claims them with a conditional stamp; only the meds this
+    pass claimed are alerted. Returns (sent, items) for notify_reminders. Caller must commit.
+    """
+    query = (
+        db.query(
+            Med.id, Med.user_id, Med.name, Med.stock_count, Med.low_stock_threshold, User.reminder_email, User.email
+        )
+        .outerjoin(User, Med.user_id == User.id)
+        .filter(
+            Med.low_stock_pending == True,
+            (Med.last_low_stock_sent_at.is_(None)) | (Med.last_low_stock_sent_at < today),
+        )
+    )
+    if med_ids is not None:
+        if not med_ids:
+            return 0, []
+        query = query.filter(Med.id.in_(med_ids))
+    rows = query.all()
+    if not rows:
+        return 0, []
+
+    # Stamp only rows still unalerted today: a concurrent pass (another cron request, the
+    # in-process scheduler or another instance) that read the same meds wins no rows here.
+    won = set(
+        db.execute(
+            update(Med)
+            .where(
+                Med.id.in_([med.id for med in rows]),
+                (Med.last_low_stock_sent_at.is_(None)) | (Med.last_low_stock_sent_at < today),
+            )
+            .values(last_low_stock_sent_at=today)
+            .returning(Med.id)
+            .execution_options(synchronize_session=False)
+        ).scalars()
+    )
+    rows = [med for med in rows if med.id in won]
+    items = [
+        ReminderItem(
+            ref=f"med:{med.id}",
+            kind="low_stock",
+            user_id=med.user_id,
+            recipient=_recipient_email(med.reminder_email, med.email),
+            slot_utc=None,
+            med_name=med.name,
+            stock_count=med.stock_count,
+            threshold=med.low_stock_threshold,
+        )
+        for med in rows
+    ]
+    return len(rows), items
+
+
+def _group_for_digest(items: list[ReminderItem], include_low_stock: bool) -> list[list[ReminderItem]]:
+    """
+    Group time-to-take items by (user, recipient, minute). Low-stock items join the recipient's
+    earliest time-to-take group when include_low_stock is set, otherwise a low-stock-only group.
+    """
+    groups: dict[tuple, list[ReminderItem]] = {}
+    first_key_for: dict[tuple, tuple] = {}
+    for item in sorted((i for i in items if i.kind == "time_to_take"), key=lambda i: i.slot_utc):
+        key = (item.user_id, item.recipient, item.slot_utc)
+        groups.setdefault(key, []).append(item)
+        first_key_for.setdefault((item.user_id, item.recipient), key)
+    for item in items:
+        if item.kind != "low_stock":
+            continue
+        key = (item.user_id, item.recipient, None)
+        if include_low_stock:
+            key = first_key_for.get((item.user_id, item.recipient), key)
+        groups.setdefault(key, []).append(item)
+    return list(groups.values())
+
+
+def notify_reminders(
+    db,
+    items: list[ReminderItem],
+    min_items: int = REMINDER_DIGEST_MIN_ITEMS,
+    include_low_stock: bool = REMINDER_DIGEST_INCLUDE_LOW_STOCK,
+) -> list[ReminderEmail]:
+    """
+    Write in-app notifications for a pass and render its emails, merging a recipient's reminders
+    for the same minute into one digest when there are at least min_items (0 = never merge).
+    Returns (ref, message) pairs for the outbox. Caller must commit.
+    """
+    notifications: list[dict] = []
+    emails: list[ReminderEmail] = []
+    for group in _group_for_digest(items, include_low_stock):
+        recipient, owner = group[0].recipient, {"user_id": group[0].user_id}
+        if min_items and len(group) >= min_items:
+            due = [(i.med_name, i.time_of_day) for i in group if i.kind == "time_to_take"]
+            low = [(i.med_name, i.stock_count, i.threshold) for i in group if i.kind == "low_stock"]
+            notifications.append({**digest_notification_values(due, low), **owner})
+            if recipient:
+                emails.append((f"digest:{group[0].ref}+{len(group) - 1}", render_reminder_digest(recipient, due, low)))
+            continue
+        for i in group:
+            if i.kind == "time_to_take":
+                notifications.append({**time_to_take_notification_values(i.med_name, i.time_of_day), **owner})
+                message = render_time_to_take_reminder(recipient, i.med_name, i.time_of_day) if recipient else None
+            else:
+                notifications.append({**low_stock_notification_values(i.med_name, i.stock_count, i.threshold), **owner})
+                message = render_low_stock_reminder(recipient, i.med_name, i.stock_count, i.threshold) if recipient else None
+            if message:
+                emails.append((i.ref, message))
+    bulk_create_notifications(db, notifications)
+    return emails
+
+
+def run_reminder_pass(
+    db,
+    now_utc: datetime,
+    earliest_slot_utc: datetime,
+    schedule_ids: list[int] | None = None,
+    full_low_stock_pass: bool = True,
+    source: str = "cron",
+) -> dict:
+    """
+    Claim, fire and notify due schedules batch by batch; each batch commits its schedule updates,
+    notifications and outbox rows together. Low-stock alerts for the meds a batch fired are folded
+    into that batch; full_low_stock_pass then checks every other pending med.
+    Records the run in cron_runs (also when it fails) and returns the recorded values.
+    """
+    metrics = RunMetrics("reminders", source)
+    owner = new_claim_owner()
+    try:
+        while True:
+            with metrics.timed("db_ms"):
+                claimed = claim_due_schedules(db, now_utc, owner, schedule_ids=schedule_ids)
+            if not claimed:
+                break
+            metrics.add("scanned", claimed)
+            try:
+                with metrics.timed("db_ms"):
+                    fired, items, fired_med_ids = fire_due_schedules(db, now_utc, earliest_slot_utc, owner, metrics)
+                    low_sent, low_items = process_low_stock_alerts(db, date.today(), med_ids=fired_med_ids)
+                with metrics.timed("notify_ms"):
+                    emails = notify_reminders(db, items + low_items)
+                with metrics.timed("db_ms"):
+                    metrics.add("emails_queued", enqueue_emails(db, emails))
+                    db.commit()
+            except Exception:
+                db.rollback()  # claims stay leased and are retried once they expire
+                raise
+            metrics.add("sent", fired)
+            metrics.add("low_stock", low_sent)
+            metrics.record_lags([item.slot_utc for item in items if item.kind == "time_to_take"])
+        if full_low_stock_pass:
+            with metrics.timed("db_ms"):
+                low_sent, low_items = process_low_stock_alerts(db, date.today())
+            with metrics.timed("notify_ms"):
+                emails = notify_reminders(db, low_items)
+            with metrics.timed("db_ms"):
+                metrics.add("emails_queued", enqueue_emails(db, emails))
+                db.commit()
+            metrics.add("low_stock", low_sent)
+    except Exception as e:
+        db.rollback()
+        metrics.error = f"{type(e).__name__}: {e}"[:500]
+        metrics.save(db)
+        raise
+    return metrics.save(db)
+
+
+def delete_reminder_fires(db, schedule_ids: list[int]) -> None:
+    """Drop the fire log of schedules about to be deleted; reminder_fires references them by FK."""
+    if schedule_ids:
+        db.query(ReminderFire).filter(ReminderFire.schedule_id.in_(schedule_ids)).delete(synchronize_session=False)
+
+
+def prune_reminder_fires(db, older_than_days: int = REMINDER_FIRE_LOG_RETENTION_DAYS) -> int:
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    deleted = db.query(ReminderFire).filter(ReminderFire.fired_at < cutoff).delete(synchronize_session=False)
+    db.commit()
+    return deleted
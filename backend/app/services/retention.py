@@ -0,0 +1,179 @@
+"""
+Notification retention. Every reminder and low-stock alert adds a notifications row, so
+RetentionWorker periodically moves rows outside NOTIFICATION_RETENTION_POLICY to the compact
+notifications_archive table (or deletes them with NOTIFICATION_ARCHIVE=false). Each batch is
+its own short transaction with a pause in between, so reminder passes and user requests get
+the write lock between batches instead of waiting behind one long prune.
+"""
+import asyncio
+import logging
+from collections import Counter
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, insert
+
+from app.config import (
+    NOTIFICATION_ARCHIVE,
+    NOTIFICATION_KEEP_LAST,
+    NOTIFICATION_RETENTION_BATCH_SIZE,
+    NOTIFICATION_RETENTION_DAYS,
+    NOTIFICATION_RETENTION_INTERVAL_SECONDS,
+    NOTIFICATION_RETENTION_POLICY,
+)
+from app.database import SessionLocal
+from app.models import Notification, NotificationArchive
+from app.services.notification import adjust_unread
+
+logger = logging.getLogger(__name__)
+
+POLICIES = {"days", "unread_plus_last", "off"}
+BATCH_PAUSE_SECONDS = 0.05
+FIRST_RUN_DELAY_SECONDS = 60  # keep cold starts free of prune work
+
+_notifications = Notification.__table__
+
+
+def notification_owners(db) -> list[int | None]:
+    """Users with notifications; None stands for rows created before inboxes were per user."""
+    return [user_id for (user_id,) in db.query(Notification.user_id).distinct().all()]
+
+
+def expired_notification_ids(db, policy: str, after_id: int, limit: int, user_id: int | None = None) -> list[int]:
+    """
+    Ids past the retention policy, ascending, starting after after_id. "days" is global;
+    "unread_plus_last" applies to one inbox (user_id).
+    """
+    query = db.query(Notification.id).filter(Notification.id > after_id)
+    if policy == "days":
+        cutoff = datetime.utcnow() - timedelta(days=NOTIFICATION_RETENTION_DAYS)
+        query = query.filter(Notification.created_at < cutoff)
+    elif policy == "unread_plus_last":
+        # Newest notification not among the user's last N; read rows up to it are archived.
+        boundary = (
+            db.query(Notification.created_at, Notification.id)
+            .filter(Notification.user_id == user_id)
+            .order_by(Notification.created_at.desc(), Notification.id.desc())
+            .offset(NOTIFICATION_KEEP_LAST)
+            .first()
+        )
+        if boundary is None:
+            return []
+        query = query.filter(
+            Notification.user_id == user_id,
+            (Notification.created_at < boundary.created_at)
+            | ((Notification.created_at == boundary.created_at) & (Notification.id <= boundary.id)),
+            Notification.read_at.isnot(None),
+        )
+    else:
+        return []
+    return [row_id for (row_id,) in query.order_by(Notification.id).limit(limit).all()]
+
+
+def move_notifications(db, ids: list[int], archive: bool = NOTIFICATION_ARCHIVE) -> int:
+    """
+    Delete the rows and, when archiving, copy them to notifications_archive in the same commit.
+    DELETE ... RETURNING means a row removed concurrently by another instance is archived (and
+    taken off its owner's unread counter) once.
+    """
+    if not ids:
+        return 0
+    rows = db.execute(
+        delete(_notifications)
+        .where(_notifications.c.id.in_(ids))
+        .returning(
+            _notifications.c.id,
+            _notifications.c.user_id,
+            _notifications.c.type,
+            _notifications.c.title,
+            _notifications.c.created_at,
+            _notifications.c.read_at,
+        )
+    ).all()
+    unread = Counter(row.user_id for row in rows if row.read_at is None)
+    adjust_unread(db, {user_id: -count for user_id, count in unread.items()})
+    if archive and rows:
+        now = datetime.utcnow()
+        db.execute(insert(NotificationArchive), [{**row._mapping, "archived_at": now} for row in rows])
+    db.commit()
+    return len(rows)
+
+
+class RetentionWorker:
+    def __init__(self, policy: str, interval_seconds: float, batch_size: int):
+        self.policy = policy
+        self.interval_seconds = interval_seconds
+        self.batch_size = batch_size
+        self._task: asyncio.Task | None = None
+
+    async def start(self) -> None:
+        if self.policy == "off" or (self._task and not self._task.done()):
+            return
+        if self.policy not in POLICIES:
+            logger.warning("Unknown NOTIFICATION_RETENTION_POLICY %r; notification retention is off", self.policy)
+            return
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if not self._task:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def _owners(self) -> list[int | None]:
+        if self.policy != "unread_plus_last":
+            return [None]
+        db = SessionLocal()
+        try:
+            return notification_owners(db)
+        finally:
+            db.close()
+
+    def _prune_batch(self, after_id: int, user_id: int | None) -> tuple[int, int | None]:
+        """Move one batch. Returns (rows moved, last id examined or None when done)."""
+        db = SessionLocal()
+        try:
+            ids = expired_notification_ids(db, self.policy, after_id, self.batch_size, user_id)
+            if not ids:
+                return 0, None
+            return move_notifications(db, ids), ids[-1]
+        finally:
+            db.close()
+
+    async def run_once(self) -> int:
+        """Prune everything currently past the policy, one batch at a time. Returns rows moved."""
+        moved_total = 0
+        for user_id in await asyncio.to_thread(self._owners):
+            after_id = 0
+            while True:
+                moved, last_id = await asyncio.to_thread(self._prune_batch, after_id, user_id)
+                if last_id is None:
+                    break
+                moved_total += moved
+                after_id = last_id
+                await asyncio.sleep(BATCH_PAUSE_SECONDS)
+        if moved_total:
+            action = "Archived" if NOTIFICATION_ARCHIVE else "Deleted"
+            logger.info("%s %d notifications (policy %s)", action, moved_total, self.policy)
+        return moved_total
+
+    async def _run(self) -> None:
+        await asyncio.sleep(min(FIRST_RUN_DELAY_SECONDS, self.interval_seconds))
+        while True:
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Notification retention failed")
+            await asyncio.sleep(self.interval_seconds)
+
+
+retention_worker = RetentionWorker(
+    policy=NOTIFICATION_RETENTION_POLICY,
+    interval_seconds=NOTIFICATION_RETENTION_INTERVAL_SECONDS,
+    batch_size=NOTIFICATION_RETENTION_BATCH_SIZE,
+)
@@ -0,0 +1,131 @@
+"""Schedule timing: weekday bitmasks and precomputed next fire times (UTC)."""
+from datetime import datetime, date, time, timedelta, timezone
+from functools import lru_cache
+from zoneinfo import ZoneInfo
+
+DEFAULT_TIMEZONE = "America/New_York"
+WEEKDAYS = ["mon", "tue", "wed", "thu", "fri", "sat", "sun"]  # bit i = date.weekday() == i
+ALL_DAYS_MASK = (1 << 7) - 1
+
+
+@lru_cache(maxsize=512)
+def schedule_tz(tz_name: str | None) -> ZoneInfo:
+    """ZoneInfo for a schedule's timezone, falling back to America/New_York if invalid."""
+    try:
+        return ZoneInfo(tz_name or DEFAULT_TIMEZONE)
+    except Exception:
+        return ZoneInfo(DEFAULT_TIMEZONE)
+
+
+def parse_days_mask(days_of_week: str | None) -> int:
+    """'daily' -> all days; 'mon,wed,fri' -> bitmask (Monday = bit 0). Unknown tokens are ignored."""
+    value = (days_of_week or "daily").strip().lower()
+    if value == "daily":
+        return ALL_DAYS_MASK
+    mask = 0
+    for token in value.split(","):
+        day = token.strip()[:3]
+        if day in WEEKDAYS:
+            mask |= 1 << WEEKDAYS.index(day)
+    return mask
+
+
+def _parse_hm(time_of_day: str) -> time | None:
+    try:
+        hour, minute = (int(p) for p in (time_of_day or "").split(":", 1))
+        return time(hour, minute)
+    except (TypeError, ValueError):
+        return None
+
+
+def local_fire_to_utc(local_date: date, hm: time, tz: ZoneInfo) -> datetime:
+    """
+    Convert a local wall-clock slot to naive UTC.
+    DST: a nonexistent time (spring-forward gap) resolves to the same instant as the pre-transition
+    offset, i.e. it fires one hour later on the wall clock; an ambiguous time (fall-back) fires once,
+    at its first occurrence.
+    """
+    local = datetime.combine(local_date, hm).replace(tzinfo=tz, fold=0)
+    return local.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def utc_to_local_slot(slot_utc: datetime, tz_name: str | None) -> datetime:
+    """Naive UTC fire time -> naive wall-clock time in the schedule's timezone (the reminder_fires key)."""
+    return slot_utc.replace(tzinfo=timezone.utc).astimezone(schedule_tz(tz_name)).replace(tzinfo=None)
+
+
+def compute_next_fire_utc(
+    time_of_day: str,
+    tz_name: str | None,
+    days_mask: int,
+    after_utc: datetime,
+) -> datetime | None:
+    """First fire time strictly after after_utc (naive UTC), or None if the schedule never fires."""
+    hm = _parse_hm(time_of_day)
+    if hm is None or not days_mask:
+        return None
+    tz = schedule_tz(tz_name)
+    start_local = after_utc.replace(tzinfo=timezone.utc).astimezone(tz).date()
+    for offset in range(-1, 9):
+        local_date = start_local + timedelta(days=offset)
+        if not days_mask & (1 << local_date.weekday()):
+            continue
+        fire_utc = local_fire_to_utc(local_date, hm, tz)
+        if fire_utc > after_utc:
+            return fire_utc
+    return None
+
+
+def upcoming_fires_utc(
+    schedules: list[tuple[int, str, str | None, int]],
+    start_utc: datetime,
+    end_utc: datetime,
+) -> dict[int, list[datetime]]:
+    """
+    Fire times in [start_utc, end_utc) for many (id, time_of_day, tz_name, days_mask) schedules.
+    Local calendar days are computed once per timezone group, then each schedule only checks its mask.
+    """
+    by_tz: dict[str, list[tuple[int, str, int]]] = {}
+    for schedule_id, time_of_day, tz_name, days_mask in schedules:
+        by_tz.setdefault(tz_name or DEFAULT_TIMEZONE, []).append((schedule_id, time_of_day, days_mask))
+    fires: dict[int, list[datetime]] = {}
+    for tz_name, group in by_tz.items():
+        tz = schedule_tz(tz_name)
+        first_day = start_utc.replace(tzinfo=timezone.utc).astimezone(tz).date() - timedelta(days=1)
+        last_day = end_utc.replace(tzinfo=timezone.utc).astimezone(tz).date() + timedelta(days=1)
+        days = [first_day + timedelta(days=i) for i in range((last_day - first_day).days + 1)]
+        for schedule_id, time_of_day, days_mask in group:
+            hm = _parse_hm(time_of_day)
+            if hm is None:
+                fires[schedule_id] = []
+                continue
+            fires[schedule_id] = [
+                fire_utc
+                for day in days
+                if days_mask & (1 << day.weekday())
+                for fire_utc in (local_fire_to_utc(day, hm, tz),)
+                if start_utc <= fire_utc < end_utc
+            ]
+    return fires
+
+
+def _current_minute_floor() -> datetime:
+    # Just before the start of the current minute, so a slot in this minute still counts as upcoming.
+    return datetime.utcnow().replace(second=0, microsecond=0) - timedelta(microseconds=1)
+
+
+def refresh_next_fire(schedule, after_utc: datetime | None = None) -> None:
+    """
+    Recompute days_mask and next_fire_at_utc on a Schedule. Call on create, update and fire
+    (on fire, pass the slot that just fired as after_utc). Caller must commit.
+    """
+    schedule.days_mask = parse_days_mask(schedule.days_of_week)
+    if not schedule.enabled:
+        schedule.next_fire_at_utc = None
+        return
+    schedule.next_fire_at_utc = compute_next_fire_utc(
+        schedule.time_of_day,
+        schedule.timezone,
+        schedule.days_mask,
+        after_utc or _current_minute_floor(),
+    )
@@ -0,0 +1,175 @@
+"""
+Optional in-process reminder scheduler (REMINDER_SCHEDULER_ENABLED=true).
+
+Keeps a min-heap of (next_fire_at_utc, schedule_id) for schedules due within the
+reload window, sleeps until the earliest one, and fires it through the same code
+path as the cron endpoint. Pillbox edits push changes in via notify_schedule_changed,
+so there is no per-minute scan and no HTTP round trip.
+"""
+import asyncio
+import heapq
+import logging
+from datetime import datetime, timedelta
+
+from app.config import REMINDER_SCHEDULER_GRACE_SECONDS, REMINDER_SCHEDULER_RELOAD_SECONDS
+from app.database import SessionLocal
+from app.models import Schedule
+from app.services.outbox import outbox_worker
+from app.services.reminders import run_reminder_pass
+
+logger = logging.getLogger(__name__)
+
+
+class ReminderScheduler:
+    def __init__(self, grace_seconds: float, reload_seconds: float):
+        self.grace = timedelta(seconds=grace_seconds)
+        self.reload_interval = timedelta(seconds=reload_seconds)
+        self._heap: list[tuple[datetime, int]] = []
+        self._scheduled: dict[int, datetime] = {}  # schedule_id -> fire time currently in the heap
+        self._window_end = datetime.min
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._wake: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self) -> None:
+        if self.running:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if not self._task:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self._loop = None
+
+    def notify_schedule_changed(self, schedule_id: int, next_fire_at_utc: datetime | None) -> None:
+        """Incremental refresh after a schedule is created, updated or deleted. Safe from any thread."""
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        loop.call_soon_threadsafe(self._apply_change, schedule_id, next_fire_at_utc)
+
+    def _apply_change(self, schedule_id: int, next_fire_at_utc: datetime | None) -> None:
+        if next_fire_at_utc is None or next_fire_at_utc > self._window_end:
+            # Stale heap entries are skipped lazily when popped.
+            self._scheduled.pop(schedule_id, None)
+        else:
+            self._push(schedule_id, next_fire_at_utc)
+        if self._wake:
+            self._wake.set()
+
+    def _push(self, schedule_id: int, fire_at: datetime) -> None:
+        self._scheduled[schedule_id] = fire_at
+        heapq.heappush(self._heap, (fire_at, schedule_id))
+
+    def _peek(self) -> datetime | None:
+        while self._heap:
+            fire_at, schedule_id = self._heap[0]
+            if self._scheduled.get(schedule_id) == fire_at:
+                return fire_at
+            heapq.heappop(self._heap)
+        return None
+
+    def _pop_due(self, now_utc: datetime) -> list[int]:
+        due: list[int] = []
+        while self._heap and self._heap[0][0] <= now_utc:
+            fire_at, schedule_id = heapq.heappop(self._heap)
+            if self._scheduled.get(schedule_id) == fire_at:
+                del self._scheduled[schedule_id]
+                due.append(schedule_id)
+        return due
+
+    def _load_window(self, now_utc: datetime) -> list[tuple[int, datetime]]:
+        """Indexed range read of schedules firing before the end of the next reload window."""
+        db = SessionLocal()
+        try:
+            return (
+                db.query(Schedule.id, Schedule.next_fire_at_utc)
+                .filter(
+                    Schedule.enabled == True,
+                    Schedule.next_fire_at_utc.isnot(None),
+                    Schedule.next_fire_at_utc <= now_utc + self.reload_interval,
+                )
+                .all()
+            )
+        finally:
+            db.close()
+
+    async def _reload(self) -> None:
+        now_utc = datetime.utcnow()
+        rows = await asyncio.to_thread(self._load_window, now_utc)
+        self._heap = []
+        self._scheduled = {}
+        self._window_end = now_utc + self.reload_interval
+        for schedule_id, fire_at in rows:
+            self._push(schedule_id, fire_at)
+
+    def _fire(self, schedule_ids: list[int], now_utc: datetime) -> list[tuple[int, datetime | None]]:
+        db = SessionLocal()
+        try:
+            run_reminder_pass(
+                db,
+                now_utc,
+                earliest_slot_utc=now_utc - self.grace,
+                schedule_ids=schedule_ids,
+                full_low_stock_pass=False,
+                source="scheduler",
+            )
+            return (
+                db.query(Schedule.id, Schedule.next_fire_at_utc)
+                .filter(Schedule.id.in_(schedule_ids))
+                .all()
+            )
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                now_utc = datetime.utcnow()
+                if now_utc >= self._window_end:
+                    await self._reload()
+                    continue
+                next_due = self._peek()
+                wake_at = min(next_due, self._window_end) if next_due else self._window_end
+                timeout = (wake_at - now_utc).total_seconds()
+                if timeout > 0:
+                    self._wake.clear()
+                    try:
+                        await asyncio.wait_for(self._wake.wait(), timeout=timeout)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                due_ids = self._pop_due(now_utc)
+                if not due_ids:
+                    continue
+                updated = await asyncio.to_thread(self._fire, due_ids, now_utc)
+                for schedule_id, next_fire_at_utc in updated:
+                    self._apply_change(schedule_id, next_fire_at_utc)
+                outbox_worker.kick()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Reminder scheduler iteration failed")
+                await asyncio.sleep(5)
+                self._window_end = datetime.min  # force a full reload
+
+
+reminder_scheduler = ReminderScheduler(
+    grace_seconds=REMINDER_SCHEDULER_GRACE_SECONDS,
+    reload_seconds=REMINDER_SCHEDULER_RELOAD_SECONDS,
+)
@@ -0,0 +1,18 @@
+"""Medication stock: keeps Med.low_stock_pending in sync with stock_count and low_stock_threshold."""
+from sqlalchemy import case, func
+
+from app.models import Med
+
+
+def refresh_low_stock_pending(med: Med) -> None:
+    """Call after changing stock_count or low_stock_threshold on a Med. Caller must commit."""
+    med.low_stock_pending = (med.stock_count or 0) <= (med.low_stock_threshold or 0)
+
+
+def decremented_stock_values(n: int) -> dict:
+    """UPDATE values that take n doses off stock (never below zero) and recompute low_stock_pending.
+
+    A NULL threshold counts as 0, as in refresh_low_stock_pending, so low_stock_pending never becomes NULL.
+    """
+    new_stock = case((Med.stock_count > n, Med.stock_count - n), else_=0)
+    return {"stock_count": new_stock, "low_stock_pending": new_stock <= func.coalesce(Med.low_stock_threshold, 0)}
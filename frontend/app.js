@@ -108,6 +108,7 @@ function updateAuthUI(user) {
     logoutBtn.classList.add("hidden");
     userEmail.classList.add("hidden");
   }
+  connectNotifications();
 }
 
 document.getElementById("login-btn").addEventListener("click", () => {
@@ -2211,9 +2212,15 @@ document.getElementById("add-schedule-form").addEventListener("submit", async (e
 });
 
 // --- Notifications ---
-const NOTIFICATION_POLL_INTERVAL = 30000; // 30 seconds
+const NOTIFICATION_POLL_INTERVAL = 30000; // 30 seconds, only when the notification stream is unavailable
+const NOTIFICATION_STREAM_RETRY_MS = 5000;
 const MOCK_NOTIFICATION_EMAILS_KEY = "pillulu_notification_emails_mock";
 let notificationPollTimer = null;
+let notificationStream = null;
+let notificationStreamGeneration = 0;
+let notificationStreamRetryTimer = null;
+let lastNotificationEventId = "";
+let notificationReloadTimer = null;
 let countdownInterval = null;
 let mockNotificationEmails = [];
 
@@ -2411,11 +2418,31 @@ function formatNotificationTime(isoStr) {
   return d.toLocaleDateString();
 }
 
+let lastUnreadCount = null;
+
+function renderUnreadBadge(count) {
+  const badge = document.getElementById("notifications-unread");
+  badge.textContent = count > 99 ? "99+" : String(count);
+  badge.classList.toggle("hidden", !count);
+}
+
 async function loadNotifications() {
+  const listEl = document.getElementById("notifications-list");
+  const emptyEl = document.getElementById("notifications-empty");
+  if (!getAuthToken()) {
+    listEl.innerHTML = "";
+    emptyEl.classList.remove("hidden");
+    renderUnreadBadge(0);
+    return;
+  }
   try {
-    const items = await fetchApi("/api/notifications");
-    const listEl = document.getElementById("notifications-list");
-    const emptyEl = document.getElementById("notifications-empty");
+    const [page, counter] = await Promise.all([
+      fetchApi("/api/notifications"),
+      fetchApi("/api/notifications/unread-count"),
+    ]);
+    lastUnreadCount = counter.unread;
+    renderUnreadBadge(counter.unread);
+    const items = page ? page.items : [];
     if (!items || items.length === 0) {
       listEl.innerHTML = "";
       emptyEl.classList.remove("hidden");
@@ -2461,9 +2488,77 @@ document.getElementById("mark-all-read-btn").addEventListener("click", async ()
   }
 });
 
+// Poll the cheap unread counter; reload the list only when it changes.
+async function pollNotifications() {
+  if (!getAuthToken()) return;
+  try {
+    const { unread } = await fetchApi("/api/notifications/unread-count");
+    if (unread !== lastUnreadCount) loadNotifications();
+  } catch (err) {
+    console.error("Failed to poll notifications:", err);
+  }
+}
+
 function startNotificationPolling() {
   if (notificationPollTimer) clearInterval(notificationPollTimer);
-  notificationPollTimer = setInterval(loadNotifications, NOTIFICATION_POLL_INTERVAL);
+  notificationPollTimer = setInterval(pollNotifications, NOTIFICATION_POLL_INTERVAL);
+}
+
+function stopNotificationPolling() {
+  if (notificationPollTimer) clearInterval(notificationPollTimer);
+  notificationPollTimer = null;
+}
+
+// New notifications are pushed over Server-Sent Events; polling is only the fallback
+// for when the stream cannot be opened.
+async function connectNotificationStream() {
+  if (notificationStream) notificationStream.close();
+  notificationStream = null;
+  clearTimeout(notificationStreamRetryTimer);
+  const generation = ++notificationStreamGeneration;
+  if (!getAuthToken()) {
+    stopNotificationPolling();
+    return;
+  }
+  if (typeof EventSource === "undefined") {
+    startNotificationPolling();
+    return;
+  }
+  let streamToken;
+  try {
+    // Short-lived and only valid for the stream, so the login token never appears in a URL.
+    ({ token: streamToken } = await fetchApi("/api/notifications/stream-token", { method: "POST" }));
+  } catch (err) {
+    startNotificationPolling();
+    notificationStreamRetryTimer = setTimeout(connectNotificationStream, NOTIFICATION_STREAM_RETRY_MS);
+    return;
+  }
+  if (generation !== notificationStreamGeneration) return; // logged out or reconnected meanwhile
+  const params = new URLSearchParams({ token: streamToken });
+  if (lastNotificationEventId) params.set("last_event_id", lastNotificationEventId);
+  const stream = new EventSource(`${API_BASE}/api/notifications/stream?${params}`);
+  stream.addEventListener("open", stopNotificationPolling);
+  stream.addEventListener("notification", (event) => {
+    lastNotificationEventId = event.lastEventId;
+    clearTimeout(notificationReloadTimer);
+    notificationReloadTimer = setTimeout(loadNotifications, 200); // one reload per burst
+  });
+  stream.addEventListener("error", () => {
+    // The browser's own retry would reuse the expired stream token: reconnect with a fresh one,
+    // polling meanwhile. last_event_id replays what was missed.
+    if (stream !== notificationStream) return;
+    stream.close();
+    notificationStream = null;
+    startNotificationPolling();
+    notificationStreamRetryTimer = setTimeout(connectNotificationStream, NOTIFICATION_STREAM_RETRY_MS);
+  });
+  notificationStream = stream;
+}
+
+function connectNotifications() {
+  lastNotificationEventId = "";
+  loadNotifications();
+  connectNotificationStream();
 }
 
 // --- Init ---
@@ -2497,7 +2592,5 @@ populateStateSelect();
     clearCaseStateForGuest();
   }
 })();
-loadNotifications();
-startNotificationPolling();
 renderCountdown();
 initNotificationEmailMockUI();
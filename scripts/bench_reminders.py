@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+Synthetic-scale benchmark for the reminder pipeline (routers/cron.py).
+
+Seeds a SQLite database with users, meds and schedules spread over realistic
+timezones, weekday patterns and peak times, marks a batch of schedules as due in
+the current minute, then calls the cron endpoints in-process and reports wall
+time, SQL statement count, peak memory and event-loop blocking for each call.
+Reminder emails go to scripts/mock_resend.py, started on a local port.
+
+Usage (from backend/, with backend requirements installed):
+    python ../scripts/bench_reminders.py --schedules 10000 --due 1000
+    python ../scripts/bench_reminders.py --schedules 500000 --due 20000 --db /tmp/pillulu-bench.db
+    python ../scripts/bench_reminders.py --db /tmp/pillulu-bench.db --reuse --due 20000   # skip seeding
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+import httpx
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+BACKEND_DIR = SCRIPTS_DIR.parent / "backend"
+
+TIMEZONES = [
+    ("America/New_York", 30), ("America/Chicago", 15), ("America/Denver", 5), ("America/Phoenix", 2),
+    ("America/Los_Angeles", 20), ("America/Anchorage", 1), ("Pacific/Honolulu", 1), ("Europe/London", 8),
+    ("Europe/Berlin", 5), ("Asia/Kolkata", 5), ("Asia/Shanghai", 4), ("Australia/Sydney", 4),
+]
+DAY_PATTERNS = [
+    ("daily", 70), ("mon,tue,wed,thu,fri", 10), ("mon,wed,fri", 8), ("tue,thu", 5), ("sat,sun", 4), ("sun", 3),
+]
+PEAK_TIMES = [("08:00", 20), ("09:00", 10), ("12:00", 6), ("18:00", 6), ("20:00", 8), ("21:00", 12), ("22:00", 6)]
+PEAK_SHARE = 0.6  # the rest is spread over quarter hours
+CHUNK = 10_000
+
+
+def _weighted(rng: random.Random, pairs: list[tuple[str, int]], k: int) -> list[str]:
+    values, weights = zip(*pairs)
+    return rng.choices(values, weights=weights, k=k)
+
+
+def _time_of_day(rng: random.Random) -> str:
+    if rng.random() < PEAK_SHARE:
+        return _weighted(rng, PEAK_TIMES, 1)[0]
+    return f"{rng.randrange(6, 24):02d}:{rng.choice((0, 15, 30, 45)):02d}"
+
+
+def _insert_chunks(conn, table, rows) -> None:
+    for i in range(0, len(rows), CHUNK):
+        conn.execute(table.insert(), rows[i:i + CHUNK])
+
+
+def seed(args, rng: random.Random) -> None:
+    from sqlalchemy import func, select
+
+    from app.database import engine
+    from app.models import Med, Schedule, User
+    from app.services.schedule import compute_next_fire_utc, parse_days_mask
+
+    per_user = args.meds_per_user * args.schedules_per_med
+    users = math.ceil(args.schedules / per_user)
+    meds = users * args.meds_per_user
+    now_utc = datetime.utcnow()
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        # init_db may already have created a default user
+        user_base = conn.execute(select(func.coalesce(func.max(User.id), 0))).scalar()
+        _insert_chunks(conn, User.__table__, [
+            {"id": user_base + i, "email": f"bench-{i}@pillulu.local", "password_hash": "x", "created_at": now_utc}
+            for i in range(1, users + 1)
+        ])
+        stock = [rng.randrange(0, 60) for _ in range(meds)]
+        _insert_chunks(conn, Med.__table__, [
+            {
+                "id": i,
+                "user_id": user_base + (i - 1) // args.meds_per_user + 1,
+                "name": f"Bench med {i}",
+                "stock_count": stock[i - 1],
+                "low_stock_threshold": 5,
+                "low_stock_pending": stock[i - 1] <= 5,
+                "created_at": now_utc,
+            }
+            for i in range(1, meds + 1)
+        ])
+        tz_names = _weighted(rng, TIMEZONES, args.schedules)
+        patterns = _weighted(rng, DAY_PATTERNS, args.schedules)
+        rows = []
+        for i in range(1, args.schedules + 1):
+            time_of_day, days_of_week = _time_of_day(rng), patterns[i - 1]
+            days_mask = parse_days_mask(days_of_week)
+            rows.append({
+                "id": i,
+                "med_id": (i - 1) // args.schedules_per_med + 1,
+                "time_of_day": time_of_day,
+                "timezone": tz_names[i - 1],
+                "days_of_week": days_of_week,
+                "days_mask": days_mask,
+                "enabled": True,
+                "next_fire_at_utc": compute_next_fire_utc(time_of_day, tz_names[i - 1], days_mask, now_utc),
+            })
+        _insert_chunks(conn, Schedule.__table__, rows)
+    print(
+        f"Seeded {users} users, {meds} meds, {args.schedules} schedules "
+        f"in {time.perf_counter() - started:.1f}s"
+    )
+
+
+def mark_due(count: int, rng: random.Random) -> None:
+    """Make `count` random schedules due in the current minute (like the 08:00 peak)."""
+    from sqlalchemy import bindparam, func, select, update
+
+    from app.database import engine
+    from app.models import ReminderFire, Schedule
+
+    minute = datetime.utcnow().replace(second=0, microsecond=0)
+    with engine.begin() as conn:
+        total = conn.execute(select(func.count(Schedule.id))).scalar()
+        ids = rng.sample(range(1, total + 1), min(count, total))
+        conn.execute(
+            update(Schedule.__table__).where(Schedule.__table__.c.id == bindparam("b_id")).values(
+                next_fire_at_utc=minute, enabled=True, claim_owner=None, claim_expires_at=None
+            ),
+            [{"b_id": i} for i in ids],
+        )
+        conn.execute(ReminderFire.__table__.delete().where(ReminderFire.__table__.c.scheduled_utc >= minute))
+    print(f"Marked {len(ids)} schedules due at {minute.isoformat()}Z")
+
+
+class StatementCounter:
+    def __init__(self, *engines):
+        from sqlalchemy import event
+
+        self.count = 0
+        for engine in engines:
+            event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *_args):
+        self.count += 1
+
+
+async def _loop_lag_monitor(samples: list[float], stop: asyncio.Event, interval: float = 0.005):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append(max(0.0, time.perf_counter() - start - interval))
+
+
+def _peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KiB on Linux
+
+
+async def measure(client: httpx.AsyncClient, counter: StatementCounter, name: str, method: str, url: str, **kwargs) -> dict:
+    counter.count = 0
+    if tracemalloc.is_tracing():
+        tracemalloc.reset_peak()
+    lag: list[float] = []
+    stop = asyncio.Event()
+    monitor = asyncio.create_task(_loop_lag_monitor(lag, stop))
+    await asyncio.sleep(0)
+    started = time.perf_counter()
+    resp = await client.request(method, url, **kwargs)
+    wall = time.perf_counter() - started
+    stop.set()
+    await monitor
+    body = resp.json() if resp.headers.get("content-type", "").startswith("application/json") else {}
+    return {
+        "name": name,
+        "status": resp.status_code,
+        "wall_ms": round(wall * 1000, 1),
+        "statements": counter.count,
+        "loop_block_max_ms": round(max(lag, default=0.0) * 1000, 1),
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+        "traced_peak_mb": round(tracemalloc.get_traced_memory()[1] / 2**20, 1) if tracemalloc.is_tracing() else None,
+        "response_bytes": len(resp.content),
+        "summary": {k: body[k] for k in ("sent", "email_queued") if k in body},
+    }
+
+
+async def wait_for_outbox(timeout: float) -> dict:
+    from app.database import SessionLocal
+    from app.services.outbox import outbox_stats
+
+    started = time.perf_counter()
+    while True:
+        db = SessionLocal()
+        try:
+            stats = outbox_stats(db)
+        finally:
+            db.close()
+        if not stats["pending"] or time.perf_counter() - started > timeout:
+            return {**stats, "drain_seconds": round(time.perf_counter() - started, 2)}
+        await asyncio.sleep(0.2)
+
+
+async def run(args) -> list[dict]:
+    from app.database import async_engine, engine
+    from app.main import app, lifespan
+
+    counter = StatementCounter(engine, async_engine.sync_engine)
+    headers = {"X-CRON-SECRET": args.secret}
+    params = {"secret": args.secret}
+    results = []
+    transport = httpx.ASGITransport(app=app)
+    async with lifespan(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            results.append(await measure(client, counter, "debug_reminders", "GET", "/api/cron/debug_reminders", params=params))
+            results.append(await measure(
+                client, counter, "reminder_forecast (24h, 1 page)", "GET", "/api/cron/reminder_forecast",
+                params={**params, "hours": 24, "limit": 100},
+            ))
+            results.append(await measure(client, counter, "send_reminders", "POST", "/api/cron/send_reminders", headers=headers))
+            results.append(await measure(client, counter, "send_reminders (idle)", "POST", "/api/cron/send_reminders", headers=headers))
+            if not args.no_email:
+                outbox = await wait_for_outbox(args.drain_timeout)
+                print(
+                    f"Outbox: drained in {outbox['drain_seconds']}s  sent={outbox['sent']} "
+                    f"pending={outbox['pending']} dead={outbox['dead']}"
+                )
+    return results
+
+
+def start_mock_resend(args) -> subprocess.Popen:
+    proc = subprocess.Popen(
+        [sys.executable, str(SCRIPTS_DIR / "mock_resend.py"), "--port", str(args.resend_port),
+         "--latency-ms", str(args.resend_latency_ms)],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    for _ in range(100):
+        try:
+            httpx.get(f"http://127.0.0.1:{args.resend_port}/stats", timeout=0.5)
+            return proc
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    proc.terminate()
+    raise SystemExit("mock_resend.py did not start")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the reminder cron endpoints at synthetic scale")
+    parser.add_argument("--schedules", type=int, default=10_000)
+    parser.add_argument("--meds-per-user", type=int, default=2)
+    parser.add_argument("--schedules-per-med", type=int, default=2)
+    parser.add_argument("--due", type=int, default=1_000, help="Schedules made due in the current minute")
+    parser.add_argument("--db", help="SQLite path (default: a temp file)")
+    parser.add_argument("--reuse", action="store_true", help="Use an already seeded --db, only mark schedules due")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--secret", default="bench-secret")
+    parser.add_argument("--no-email", action="store_true", help="Don't configure email (no outbox rows)")
+    parser.add_argument("--resend-port", type=int, default=9300)
+    parser.add_argument("--resend-latency-ms", type=float, default=150.0)
+    parser.add_argument("--drain-timeout", type=float, default=120.0)
+    parser.add_argument("--trace-memory", action="store_true", help="Also report tracemalloc peaks (slower)")
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    db_path = args.db or os.path.join(tempfile.mkdtemp(prefix="pillulu-bench-"), "bench.db")
+    if not args.reuse and os.path.exists(db_path):
+        raise SystemExit(f"{db_path} exists; pass --reuse or remove it")
+    # Configure the app before it is imported
+    os.environ["DATABASE_PATH"] = db_path
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    os.environ["CRON_SECRET"] = args.secret
+    os.environ["REMINDER_SCHEDULER_ENABLED"] = "false"
+    if args.no_email:
+        os.environ["RESEND_API_KEY"] = ""
+    else:
+        os.environ["RESEND_API_KEY"] = "re_bench"
+        os.environ.setdefault("FROM_EMAIL", "reminders@pillulu.local")
+        os.environ["RESEND_BASE_URL"] = f"http://127.0.0.1:{args.resend_port}"
+    sys.path.insert(0, str(BACKEND_DIR))
+
+    from app.database import init_db
+
+    rng = random.Random(args.seed)
+    init_db()
+    if not args.reuse:
+        seed(args, rng)
+    mark_due(args.due, rng)
+
+    mock = None if args.no_email else start_mock_resend(args)
+    try:
+        if args.trace_memory:
+            tracemalloc.start()
+        results = asyncio.run(run(args))
+    finally:
+        if mock:
+            mock.terminate()
+
+    print(f"\nDatabase: {db_path}")
+    print(f"{'call':34} {'status':>6} {'wall ms':>10} {'stmts':>7} {'loop block ms':>14} {'peak RSS MB':>12} {'resp KB':>8}")
+    for r in results:
+        print(
+            f"{r['name']:34} {r['status']:>6} {r['wall_ms']:>10.1f} {r['statements']:>7} "
+            f"{r['loop_block_max_ms']:>14.1f} {r['peak_rss_mb']:>12.1f} {r['response_bytes'] / 1024:>8.1f}"
+            + (f"  traced peak {r['traced_peak_mb']} MB" if r["traced_peak_mb"] is not None else "")
+            + (f"  {r['summary']}" if r["summary"] else "")
+        )
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"args": vars(args), "db": db_path, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Regression check: schedules and meds can be deleted after their reminders have fired.
+
+Each handled reminder slot leaves a reminder_fires row pointing at its schedule, so a
+delete that does not clear those rows first violates the foreign key on any database
+that enforces it. The script runs the app in-process against a fresh SQLite database
+with foreign-key enforcement switched on (or against the PostgreSQL database given by
+--database-url, which always enforces them), fires two schedules through the cron pass,
+then deletes one schedule and the med that owns the other. It exits 1 if a delete fails
+or leaves reminder_fires rows behind.
+
+Usage (from backend/, with backend requirements installed):
+    python ../scripts/check_fired_deletes.py
+    python ../scripts/check_fired_deletes.py --database-url postgresql://localhost/pillulu_check
+"""
+import argparse
+import os
+import sys
+import tempfile
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+BACKEND_DIR = SCRIPTS_DIR.parent / "backend"
+SECRET = "check-secret"
+
+
+def enforce_sqlite_foreign_keys(engine) -> None:
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_conn, _record):
+        cursor = dbapi_conn.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+
+
+def run(client, db_factory) -> list[str]:
+    """Failure messages; empty when every delete succeeded and cleaned up its fire log."""
+    from app.models import ReminderFire
+
+    def ok(response):
+        if response.status_code >= 400:
+            raise SystemExit(f"{response.request.method} {response.request.url} -> {response.status_code}: {response.text}")
+        return response.json()
+
+    def fires(schedule_ids):
+        db = db_factory()
+        try:
+            return db.query(ReminderFire).filter(ReminderFire.schedule_id.in_(schedule_ids)).count()
+        finally:
+            db.close()
+
+    token = ok(client.post("/api/auth/register", json={"email": f"deletes-{uuid.uuid4().hex[:8]}@pillulu.local", "password": "secret1"}))["token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    now_hm = datetime.utcnow().strftime("%H:%M")
+    med = ok(client.post("/api/pillbox/meds", json={"name": "Ibuprofen", "stock_count": 10}, headers=headers))
+    first = ok(client.post(f"/api/pillbox/meds/{med['id']}/schedules", json={"time_of_day": now_hm, "timezone": "UTC"}, headers=headers))
+    second = ok(client.post(f"/api/pillbox/meds/{med['id']}/schedules", json={"time_of_day": now_hm, "timezone": "UTC"}, headers=headers))
+    ok(client.post("/api/cron/send_reminders", headers={"X-CRON-SECRET": SECRET}))
+
+    failures = []
+    schedule_ids = [first["id"], second["id"]]
+    if fires(schedule_ids) < len(schedule_ids):
+        failures.append("the cron pass did not log a fire for both schedules; nothing to check")
+        return failures
+
+    response = client.delete(f"/api/schedules/{first['id']}", headers=headers)
+    if response.status_code != 200:
+        failures.append(f"DELETE schedule with fires -> {response.status_code}: {response.text}")
+    response = client.delete(f"/api/pillbox/meds/{med['id']}", headers=headers)
+    if response.status_code != 200:
+        failures.append(f"DELETE med with fired schedules -> {response.status_code}: {response.text}")
+    left = fires(schedule_ids)
+    if not failures and left:
+        failures.append(f"{left} reminder_fires rows left behind")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fail if fired schedules or their meds cannot be deleted")
+    parser.add_argument("--database-url", help="Run against this database (e.g. PostgreSQL) instead of a fresh SQLite file")
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(prefix="pillulu-deletes-"), "deletes.db")
+    os.environ["DATABASE_PATH"] = db_path
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{db_path}"
+    os.environ["CRON_SECRET"] = SECRET
+    os.environ["REMINDER_SCHEDULER_ENABLED"] = "false"
+    os.environ["RESEND_API_KEY"] = ""
+    os.environ["OPENAI_API_KEY"] = ""
+    sys.path.insert(0, str(BACKEND_DIR))
+
+    from fastapi.testclient import TestClient
+
+    from app.database import SessionLocal, async_engine, engine
+    from app.main import app
+
+    if engine.dialect.name == "sqlite":
+        enforce_sqlite_foreign_keys(engine)
+        enforce_sqlite_foreign_keys(async_engine.sync_engine)
+    with TestClient(app) as client:
+        failures = run(client, SessionLocal)
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    print("fired schedule and med deletes ok" if not failures else f"\n{len(failures)} failure(s)")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Query-plan regression check for the hot queries in the routers and the reminder pipeline.
+
+Runs the app in-process against a fresh SQLite database, exercises the pillbox, cases,
+notifications, AI history, user and cron endpoints plus the outbox worker and the
+in-process scheduler, and records every SELECT/UPDATE/DELETE they issue. Each distinct
+statement is then run through EXPLAIN QUERY PLAN. The script exits 1 if any of them
+scans a whole table; a scan that walks an index (e.g. ORDER BY ... LIMIT) is fine.
+
+Usage (from backend/, with backend requirements installed):
+    python ../scripts/check_query_plans.py
+    python ../scripts/check_query_plans.py --verbose   # print every plan
+"""
+import argparse
+import asyncio
+import os
+import re
+import sqlite3
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+BACKEND_DIR = SCRIPTS_DIR.parent / "backend"
+SECRET = "check-secret"
+
+_CHECKED = re.compile(r"^\s*(SELECT|UPDATE|DELETE|WITH)\b", re.IGNORECASE)
+_FULL_SCAN = re.compile(r"^SCAN (?:TABLE )?(\w+)(.*)$")
+
+
+class StatementRecorder:
+    def __init__(self, *engines):
+        from sqlalchemy import event
+
+        self.statements: dict[str, tuple] = {}
+        for engine in engines:
+            event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if not _CHECKED.match(statement) or statement in self.statements:
+            return
+        if executemany:
+            parameters = parameters[0] if parameters else ()
+        self.statements[statement] = tuple(parameters or ())
+
+
+def exercise(client) -> None:
+    """Hit every DB-backed endpoint once, with enough data for each code path to run."""
+    def ok(response):
+        if response.status_code >= 400:
+            raise SystemExit(f"{response.request.method} {response.request.url} -> {response.status_code}: {response.text}")
+        return response.json()
+
+    token = ok(client.post("/api/auth/register", json={"email": "plans@pillulu.local", "password": "secret1"}))["token"]
+    ok(client.post("/api/auth/login", json={"email": "plans@pillulu.local", "password": "secret1"}))
+    headers = {"Authorization": f"Bearer {token}"}
+    cron = {"X-CRON-SECRET": SECRET}
+    ok(client.get("/api/auth/me", headers=headers))
+
+    ok(client.put("/api/user/email", json={"email": "reminders@pillulu.local"}, headers=headers))
+    ok(client.get("/api/user/email", headers=headers))
+    ok(client.put("/api/user/profile", json={"full_name": "Plan Check"}, headers=headers))
+    ok(client.get("/api/user/profile", headers=headers))
+
+    med = ok(client.post("/api/pillbox/meds", json={"name": "Ibuprofen", "stock_count": 6, "low_stock_threshold": 5}, headers=headers))
+    spare = ok(client.post("/api/pillbox/meds", json={"name": "Cetirizine", "stock_count": 30}, headers=headers))
+    now_hm = datetime.utcnow().strftime("%H:%M")
+    schedule = ok(client.post(f"/api/pillbox/meds/{med['id']}/schedules", json={"time_of_day": now_hm, "timezone": "UTC"}, headers=headers))
+    ok(client.post(f"/api/pillbox/meds/{spare['id']}/schedules", json={"time_of_day": "08:00", "timezone": "America/New_York"}, headers=headers))
+    ok(client.get("/api/pillbox/meds", headers=headers))
+    ok(client.get(f"/api/pillbox/meds/{med['id']}", headers=headers))
+    ok(client.get(f"/api/pillbox/meds/{med['id']}/schedules", headers=headers))
+    ok(client.put(f"/api/pillbox/meds/{spare['id']}", json={"stock_count": 29}, headers=headers))
+    ok(client.put(f"/api/schedules/{schedule['id']}", json={"time_of_day": now_hm}, headers=headers))
+
+    case = ok(client.post("/api/cases", json={"title": "Headache", "body_part": "head"}, headers=headers))
+    ok(client.get("/api/cases", headers=headers))
+    ok(client.get("/api/cases", params={"body_part": "head"}, headers=headers))
+    ok(client.put(f"/api/cases/{case['id']}", json={"severity": 2}, headers=headers))
+    ok(client.post("/api/ai/ask", json={"question": "show my past cases"}, headers=headers))
+
+    ok(client.get("/api/cron/debug_reminders", params={"secret": SECRET}))
+    forecast = ok(client.get("/api/cron/reminder_forecast", params={"secret": SECRET, "limit": 1}))
+    if forecast.get("next_cursor"):
+        ok(client.get("/api/cron/reminder_forecast", params={"secret": SECRET, "limit": 1, "cursor": forecast["next_cursor"]}))
+    ok(client.post("/api/cron/send_reminders", headers=cron))
+    ok(client.post("/api/cron/send_reminders", headers=cron))
+    ok(client.post("/api/cron/decrement_stock", json={"secret": SECRET, "med_id": spare["id"]}))
+    ok(client.get("/api/cron/metrics", params={"secret": SECRET}))
+    ok(client.get("/api/cron/email_outbox", params={"secret": SECRET}))
+
+    notifications = ok(client.get("/api/notifications", params={"limit": 1}, headers=headers))
+    if notifications["next_cursor"]:
+        ok(client.get("/api/notifications", params={"limit": 1, "cursor": notifications["next_cursor"]}, headers=headers))
+    if notifications["items"]:
+        ok(client.put(f"/api/notifications/{notifications['items'][0]['id']}/read", headers=headers))
+        ok(client.put("/api/notifications/read", json={"ids": [n["id"] for n in notifications["items"]]}, headers=headers))
+    ok(client.get("/api/notifications/unread-count", headers=headers))
+    ok(client.put("/api/notifications/read-all", headers=headers))
+    ok(client.delete("/api/notifications", params={"older_than_days": 30}, headers=headers))
+
+    ok(client.delete(f"/api/cases/{case['id']}", headers=headers))
+    ok(client.delete(f"/api/schedules/{schedule['id']}", headers=headers))
+    ok(client.delete(f"/api/pillbox/meds/{spare['id']}", headers=headers))
+
+
+def exercise_background(db_factory) -> None:
+    """Code paths that run outside a plain request: outbox delivery, pruning, retention, scheduler window load, notification stream reads."""
+    from app.models import User
+    from app.services.metrics import prune_cron_runs
+    from app.services.notification import latest_notification_cursor, notifications_after
+    from app.services.outbox import outbox_worker, prune_sent
+    from app.services.reminders import prune_reminder_fires
+    from app.services.retention import RetentionWorker
+    from app.services.scheduler import reminder_scheduler
+
+    asyncio.run(outbox_worker.deliver_once())
+    for policy in ("days", "unread_plus_last"):
+        asyncio.run(RetentionWorker(policy, interval_seconds=3600, batch_size=100).run_once())
+    reminder_scheduler._load_window(datetime.utcnow() + timedelta(days=1))
+    db = db_factory()
+    try:
+        user_id = db.query(User.id).filter(User.email == "plans@pillulu.local").scalar()
+        notifications_after(db, user_id, latest_notification_cursor(db, user_id))  # notification stream
+        notifications_after(db, user_id, None)
+        prune_reminder_fires(db)
+        prune_cron_runs(db)
+        prune_sent(db)
+    finally:
+        db.close()
+
+
+def explain(db_path: str, statements: dict[str, tuple]) -> list[tuple[str, list[str], list[str]]]:
+    """(statement, plan lines, full-scan lines) per statement."""
+    conn = sqlite3.connect(db_path)
+    tables = {name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    results = []
+    try:
+        for statement, params in statements.items():
+            plan = [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {statement}", params)]
+            scans = []
+            for line in plan:
+                match = _FULL_SCAN.match(line)
+                if match and match.group(1) in tables and "USING" not in match.group(2):
+                    scans.append(line)
+            results.append((statement, plan, scans))
+    finally:
+        conn.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fail on full table scans in the app's hot queries")
+    parser.add_argument("--verbose", action="store_true", help="Print the plan of every statement")
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(prefix="pillulu-plans-"), "plans.db")
+    # Configure the app before it is imported. Emails are queued but delivery goes to a closed port.
+    os.environ["DATABASE_PATH"] = db_path
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"  # EXPLAIN QUERY PLAN is SQLite's
+    os.environ["CRON_SECRET"] = SECRET
+    os.environ["REMINDER_SCHEDULER_ENABLED"] = "false"
+    os.environ["RESEND_API_KEY"] = "re_check"
+    os.environ["FROM_EMAIL"] = "reminders@pillulu.local"
+    os.environ["RESEND_BASE_URL"] = "http://127.0.0.1:9"
+    os.environ["OPENAI_API_KEY"] = ""
+    sys.path.insert(0, str(BACKEND_DIR))
+
+    from fastapi.testclient import TestClient
+
+    from app.database import SessionLocal, async_engine, engine, init_db
+    from app.main import app
+
+    init_db()  # one-off migration queries are not hot paths
+    recorder = StatementRecorder(engine, async_engine.sync_engine)
+    with TestClient(app) as client:
+        exercise(client)
+    exercise_background(SessionLocal)
+
+    results = explain(db_path, recorder.statements)
+    failures = [r for r in results if r[2]]
+    for statement, plan, scans in results:
+        if args.verbose or scans:
+            print(("FULL SCAN" if scans else "ok") + ": " + " ".join(statement.split()))
+            for line in plan:
+                print(f"    {line}")
+    print(f"\n{len(results)} distinct statements checked, {len(failures)} with full table scans")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Load test for /api/ai/ask (run against a backend pointed at scripts/mock_openai.py).
+
+Reports throughput, latency percentiles, status codes and /health probe latency under
+load. /health does no I/O, so its latency rising with load means the server's event loop
+is being blocked.
+
+Usage:
+    python scripts/load_test_ai.py --base-url http://127.0.0.1:8000 --requests 500 --concurrency 50
+    python scripts/load_test_ai.py --auth --history 10 --users 5
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+import uuid
+from collections import Counter
+
+import httpx
+
+QUESTIONS = [
+    "I have a sore throat, what can I take?",
+    "What helps with a tension headache?",
+    "Is it safe to take ibuprofen with coffee?",
+    "What can I take for seasonal allergies?",
+    "I have a mild fever and body aches, any suggestions?",
+]
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * (len(ordered) - 1)))))
+    return ordered[idx]
+
+
+def _summary(name: str, latencies: list[float]) -> str:
+    if not latencies:
+        return f"{name}: no samples"
+    ms = [x * 1000 for x in latencies]
+    return (
+        f"{name}: n={len(ms)} mean={statistics.mean(ms):.1f}ms p50={_percentile(ms, 50):.1f}ms "
+        f"p95={_percentile(ms, 95):.1f}ms p99={_percentile(ms, 99):.1f}ms max={max(ms):.1f}ms"
+    )
+
+
+async def _create_user(client: httpx.AsyncClient, history: int) -> str:
+    email = f"loadtest-{uuid.uuid4().hex[:10]}@pillulu.local"
+    resp = await client.post("/api/auth/register", json={"email": email, "password": "loadtest-pass"})
+    resp.raise_for_status()
+    token = resp.json()["token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    body_parts = ["head", "chest", "abdomen", "left_arm", "right_leg"]
+    for i in range(history):
+        await client.post(
+            "/api/cases",
+            headers=headers,
+            json={
+                "title": f"Load test case {i}",
+                "diagnosis": "Seasonal allergies" if i % 2 else "Tension headache",
+                "body_part": body_parts[i % len(body_parts)],
+                "severity": 1 + i % 5,
+                "status": "active",
+                "notes": "Synthetic record for load testing",
+            },
+        )
+    return token
+
+
+async def _health_probe(client: httpx.AsyncClient, samples: list[float], stop: asyncio.Event, interval: float = 0.2):
+    while not stop.is_set():
+        start = time.perf_counter()
+        try:
+            await client.get("/health")
+            samples.append(time.perf_counter() - start)
+        except httpx.HTTPError:
+            pass
+        await asyncio.sleep(interval)
+
+
+async def run(args):
+    limits = httpx.Limits(max_connections=args.concurrency + 4, max_keepalive_connections=args.concurrency + 4)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        tokens: list[str | None] = [None]
+        if args.auth:
+            tokens = [await _create_user(client, args.history) for _ in range(max(1, args.users))]
+            if args.mix_anonymous:
+                tokens.append(None)
+
+        latencies: list[float] = []
+        statuses: Counter = Counter()
+        retry_after: list[int] = []
+        health: list[float] = []
+        stop = asyncio.Event()
+        background = [asyncio.create_task(_health_probe(client, health, stop))]
+
+        queue: asyncio.Queue = asyncio.Queue()
+        for i in range(args.requests):
+            queue.put_nowait(i)
+
+        async def worker():
+            while True:
+                try:
+                    i = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                token = tokens[i % len(tokens)]
+                headers = {"Authorization": f"Bearer {token}"} if token else {}
+                start = time.perf_counter()
+                try:
+                    resp = await client.post(
+                        "/api/ai/ask",
+                        headers=headers,
+                        json={"question": random.choice(QUESTIONS)},
+                    )
+                    statuses[resp.status_code] += 1
+                    if resp.status_code == 429 and resp.headers.get("Retry-After"):
+                        retry_after.append(int(resp.headers["Retry-After"]))
+                except httpx.HTTPError as exc:
+                    statuses[type(exc).__name__] += 1
+                latencies.append(time.perf_counter() - start)
+
+        started = time.perf_counter()
+        await asyncio.gather(*[worker() for _ in range(args.concurrency)])
+        elapsed = time.perf_counter() - started
+        stop.set()
+        await asyncio.gather(*background, return_exceptions=True)
+
+    ok = statuses.get(200, 0)
+    print(f"Requests: {args.requests}  concurrency: {args.concurrency}  auth users: {len([t for t in tokens if t])}")
+    print(f"Wall time: {elapsed:.2f}s  throughput: {args.requests / elapsed:.1f} req/s  ok: {ok / elapsed:.1f} req/s")
+    print("Status codes: " + ", ".join(f"{k}={v}" for k, v in sorted(statuses.items(), key=lambda kv: str(kv[0]))))
+    if retry_after:
+        print(f"Retry-After: min={min(retry_after)}s max={max(retry_after)}s")
+    print(_summary("Latency", latencies))
+    print(_summary("/health probe latency under load", health))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test /api/ai/ask")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--auth", action="store_true", help="Register test users and send Bearer tokens")
+    parser.add_argument("--users", type=int, default=1, help="Number of test users when --auth is set")
+    parser.add_argument("--history", type=int, default=0, help="Case history records to create per test user")
+    parser.add_argument("--mix-anonymous", action="store_true", help="With --auth, also send anonymous requests")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
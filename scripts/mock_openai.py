@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Local OpenAI Chat Completions stand-in for offline load testing.
+
+Returns canned payloads in the Pillulu SYSTEM_PROMPT JSON format (or a plain
+sentence for the general-use prompt), with tunable latency, streaming and error rates.
+
+Usage (from backend/, with backend requirements installed):
+    python ../scripts/mock_openai.py --port 9100 --latency-ms 800 --jitter-ms 300 --error-rate 0.02
+
+Then start the backend against it:
+    OPENAI_API_KEY=sk-mock OPENAI_BASE_URL=http://127.0.0.1:9100/v1 uvicorn app.main:app --port 8000
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+DEFAULT_ASK_PAYLOAD = {
+    "answer": (
+        "For a mild headache, acetaminophen or ibuprofen are commonly used over-the-counter options. "
+        "Individual factors matter, so please check with a doctor or pharmacist."
+    ),
+    "suggested_medications": ["acetaminophen", "ibuprofen"],
+    "related_case_ids": [],
+    "suggested_case_record": {"should_add": False},
+}
+DEFAULT_GENERAL_USE = "Commonly used to relieve mild to moderate pain and reduce fever."
+
+app = FastAPI(title="Mock OpenAI")
+settings = argparse.Namespace()
+stats = {"requests": 0, "errors": 0, "streams": 0}
+
+
+def _is_general_use_request(messages: list[dict]) -> bool:
+    system = next((m.get("content", "") for m in messages if m.get("role") == "system"), "")
+    return "medication information assistant" in system
+
+
+def _reply_text(messages: list[dict]) -> str:
+    if _is_general_use_request(messages):
+        return settings.general_use_text
+    payload = dict(settings.ask_payload)
+    if settings.echo_case_ids:
+        # Reference the first known case id if the backend sent any history.
+        user_msg = next((m.get("content", "") for m in messages if m.get("role") == "user"), "")
+        marker = "Known case history records (may be empty): "
+        if marker in user_msg:
+            try:
+                records = json.loads(user_msg.split(marker, 1)[1])
+                payload["related_case_ids"] = [r["id"] for r in records[:2] if "id" in r]
+            except (ValueError, KeyError, TypeError):
+                pass
+    return json.dumps(payload)
+
+
+def _completion(model: str, text: str) -> dict:
+    return {
+        "id": f"chatcmpl-mock-{uuid.uuid4().hex[:12]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [
+            {"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}
+        ],
+        "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+    }
+
+
+async def _stream(model: str, text: str):
+    chunk_id = f"chatcmpl-mock-{uuid.uuid4().hex[:12]}"
+    size = max(1, settings.stream_chunk_chars)
+    for i in range(0, len(text), size):
+        chunk = {
+            "id": chunk_id,
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "delta": {"content": text[i:i + size]}, "finish_reason": None}],
+        }
+        yield f"data: {json.dumps(chunk)}\n\n"
+        await asyncio.sleep(settings.stream_chunk_delay_ms / 1000.0)
+    done = {
+        "id": chunk_id,
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+    }
+    yield f"data: {json.dumps(done)}\n\n"
+    yield "data: [DONE]\n\n"
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    stats["requests"] += 1
+    body = await request.json()
+    latency = settings.latency_ms + random.uniform(-settings.jitter_ms, settings.jitter_ms)
+    await asyncio.sleep(max(0.0, latency) / 1000.0)
+
+    if random.random() < settings.error_rate:
+        stats["errors"] += 1
+        return JSONResponse(
+            status_code=settings.error_status,
+            content={"error": {"message": "mock error", "type": "server_error", "code": None}},
+        )
+
+    model = body.get("model", "gpt-4o-mini")
+    text = _reply_text(body.get("messages", []))
+    if body.get("stream"):
+        stats["streams"] += 1
+        return StreamingResponse(_stream(model, text), media_type="text/event-stream")
+    return _completion(model, text)
+
+
+@app.get("/stats")
+def get_stats():
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock OpenAI chat-completions server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency-ms", type=float, default=600.0, help="Base response latency")
+    parser.add_argument("--jitter-ms", type=float, default=200.0, help="Uniform +/- jitter on latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests that fail (0-1)")
+    parser.add_argument("--error-status", type=int, default=500, help="HTTP status for injected errors (e.g. 429, 500)")
+    parser.add_argument("--stream-chunk-chars", type=int, default=24)
+    parser.add_argument("--stream-chunk-delay-ms", type=float, default=20.0)
+    parser.add_argument("--payload-file", help="JSON file overriding the /api/ai/ask payload")
+    parser.add_argument("--general-use-text", default=DEFAULT_GENERAL_USE)
+    parser.add_argument("--echo-case-ids", action="store_true", help="Return related_case_ids from the sent history")
+    args = parser.parse_args()
+
+    args.ask_payload = DEFAULT_ASK_PAYLOAD
+    if args.payload_file:
+        with open(args.payload_file) as f:
+            args.ask_payload = json.load(f)
+    vars(settings).update(vars(args))
+
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Local Resend stand-in for testing reminder email delivery without sending real email.
+
+Implements POST /emails and POST /emails/batch (including permissive validation
+errors), with tunable latency and failure rates. GET /stats reports call counts.
+
+Usage (from backend/, with backend requirements installed):
+    python ../scripts/mock_resend.py --port 9200 --latency-ms 150 --batch-error-rate 0.1
+
+Then point the backend at it:
+    RESEND_API_KEY=re_mock FROM_EMAIL=reminders@pillulu.local RESEND_BASE_URL=http://127.0.0.1:9200 \\
+        uvicorn app.main:app --port 8000
+"""
+import argparse
+import asyncio
+import random
+import uuid
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+app = FastAPI(title="Mock Resend")
+settings = argparse.Namespace()
+stats = {"single_calls": 0, "batch_calls": 0, "emails_accepted": 0, "emails_rejected": 0, "failed_calls": 0}
+
+
+async def _delay():
+    latency = settings.latency_ms + random.uniform(-settings.jitter_ms, settings.jitter_ms)
+    await asyncio.sleep(max(0.0, latency) / 1000.0)
+
+
+def _failed_call() -> JSONResponse:
+    stats["failed_calls"] += 1
+    return JSONResponse(status_code=settings.error_status, content={"name": "internal_server_error", "message": "mock error"})
+
+
+@app.post("/emails")
+async def send_one(request: Request):
+    stats["single_calls"] += 1
+    await request.json()
+    await _delay()
+    if random.random() < settings.error_rate:
+        return _failed_call()
+    stats["emails_accepted"] += 1
+    return {"id": str(uuid.uuid4())}
+
+
+@app.post("/emails/batch")
+async def send_batch(request: Request):
+    stats["batch_calls"] += 1
+    messages = await request.json()
+    await _delay()
+    if random.random() < settings.batch_error_rate:
+        return _failed_call()
+    if len(messages) > 100:
+        return JSONResponse(status_code=422, content={"name": "validation_error", "message": "Max 100 emails per batch"})
+    data, errors = [], []
+    permissive = request.headers.get("x-batch-validation") == "permissive"
+    for index, message in enumerate(messages):
+        if random.random() < settings.reject_rate:
+            errors.append({"index": index, "message": "mock rejection"})
+            continue
+        data.append({"id": str(uuid.uuid4())})
+    if errors and not permissive:
+        stats["emails_rejected"] += len(messages)
+        return JSONResponse(status_code=422, content={"name": "validation_error", "message": "mock rejection"})
+    stats["emails_accepted"] += len(data)
+    stats["emails_rejected"] += len(errors)
+    return {"data": data, "errors": errors} if permissive else {"data": data}
+
+
+@app.get("/stats")
+def get_stats():
+    return stats
+
+
+@app.post("/stats/reset")
+def reset_stats():
+    for key in stats:
+        stats[key] = 0
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock Resend email API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9200)
+    parser.add_argument("--latency-ms", type=float, default=150.0)
+    parser.add_argument("--jitter-ms", type=float, default=50.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of single-send calls that fail")
+    parser.add_argument("--batch-error-rate", type=float, default=0.0, help="Fraction of batch calls that fail")
+    parser.add_argument("--reject-rate", type=float, default=0.0, help="Fraction of messages rejected inside a batch")
+    parser.add_argument("--error-status", type=int, default=500)
+    vars(settings).update(vars(parser.parse_args()))
+    uvicorn.run(app, host=settings.host, port=settings.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()